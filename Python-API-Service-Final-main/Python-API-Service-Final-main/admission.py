@@ -0,0 +1,213 @@
+"""Per-route-group admission control and load shedding.
+
+Each group (catalog, auth, checkout, admin, events) allows a fixed number of
+requests in flight per worker process, from Config.ADMISSION_GROUPS as
+"concurrency/queue/max_wait_seconds". Extra requests wait in a bounded queue;
+when the queue is full or the wait passes its deadline, the request is shed
+with 503 and Retry-After before the view runs. /health is never gated.
+
+A streamed response (the order-events SSE stream) keeps its slot until the
+body is closed, not just until the view returns, so the events group caps how
+many worker threads long-lived streams can hold.
+
+Queued requests hold a worker thread, so limits are checked against
+SERVE_THREADS: a group's concurrency + queue is capped at SERVE_THREADS - 1,
+and on top of the groups every request except /health takes one of
+SERVE_THREADS - 1 worker-wide slots before it is admitted or queued. However
+the groups add up, one thread is always left for /health. With a single thread
+(sync workers) nothing can ever queue in-process and admission control is
+turned off.
+"""
+import threading
+import time
+
+from flask import current_app, jsonify, request
+
+GROUP_ENDPOINTS = {
+    "front.category_list": "catalog",
+    "front.category_products": "catalog",
+    "front.product_list": "catalog",
+    "front.login": "auth",
+    "front.register": "auth",
+    "front.reset_password": "auth",
+    "admin.admin_login": "auth",
+    "front.checkout": "checkout",
+    "front.order_events": "events",
+}
+EXEMPT_ENDPOINTS = {"health"}
+ENVIRON_KEY = "admission.gate"
+TOTAL_KEY = "admission.total"
+
+
+class Gate:
+    def __init__(self, name, concurrency, queue, max_wait):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.max_wait = max_wait
+        self.cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    def acquire(self):
+        with self.cond:
+            if self.active < self.concurrency and not self.waiting:
+                self.active += 1
+                self.admitted += 1
+                return True
+            if self.waiting >= self.queue:
+                self.shed_queue_full += 1
+                return False
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while self.active >= self.concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed_timeout += 1
+                        return False
+                    self.cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        with self.cond:
+            self.active -= 1
+            self.cond.notify()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "concurrency": self.concurrency,
+                "queue": self.queue,
+                "max_wait": self.max_wait,
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_timeout": self.shed_timeout,
+            }
+
+
+class Budget:
+    """Worker-wide cap on requests holding a thread (running or queued), across all groups."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.shed = 0
+
+    def acquire(self):
+        with self.lock:
+            if self.in_use >= self.limit:
+                self.shed += 1
+                return False
+            self.in_use += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_use -= 1
+
+    def stats(self):
+        with self.lock:
+            return {"limit": self.limit, "in_use": self.in_use, "shed": self.shed}
+
+
+def parse_group(name, value, threads):
+    """Build a Gate, capping concurrency + queue at threads - 1; returns (gate, capped)."""
+    concurrency, queue, max_wait = value.split("/")
+    concurrency, queue = int(concurrency), int(queue)
+    if concurrency < 1 or queue < 0:
+        raise ValueError(f"ADMISSION_GROUPS[{name!r}]: concurrency must be >= 1 and queue >= 0")
+    capped_concurrency = min(concurrency, threads - 1)
+    capped_queue = min(queue, threads - 1 - capped_concurrency)
+    gate = Gate(name, capped_concurrency, capped_queue, float(max_wait))
+    return gate, (capped_concurrency, capped_queue) != (concurrency, queue)
+
+
+def route_group(endpoint):
+    if not endpoint or endpoint in EXEMPT_ENDPOINTS:
+        return None
+    group = GROUP_ENDPOINTS.get(endpoint)
+    if group is None and endpoint.startswith("admin."):
+        group = "admin"
+    return group
+
+
+def stats():
+    gates = current_app.extensions.get("admission", {})
+    return {name: gate.stats() for name, gate in gates.items()}
+
+
+def total_stats():
+    budget = current_app.extensions.get(TOTAL_KEY)
+    return budget.stats() if budget else None
+
+
+def overloaded(app):
+    resp = jsonify({"message": "service overloaded, retry later"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(app.config["ADMISSION_RETRY_AFTER"])
+    return resp
+
+
+def held_slots():
+    """Pop the slots this request holds; returns their release callables."""
+    slots = (request.environ.pop(ENVIRON_KEY, None), request.environ.pop(TOTAL_KEY, None))
+    return [slot.release for slot in slots if slot is not None]
+
+
+def init_app(app):
+    if not app.config.get("ADMISSION_ENABLED"):
+        return
+    threads = app.config["SERVE_THREADS"]
+    if threads < 2:
+        app.logger.warning("admission control needs SERVE_THREADS > 1 (threaded workers); disabled")
+        return
+    gates = {}
+    for name, value in app.config["ADMISSION_GROUPS"].items():
+        gates[name], capped = parse_group(name, value, threads)
+        if capped:
+            app.logger.warning(
+                "admission group %s: %s does not fit %d threads per worker; using %d/%d",
+                name, value, threads, gates[name].concurrency, gates[name].queue,
+            )
+    budget = Budget(threads - 1)
+    app.extensions["admission"] = gates
+    app.extensions[TOTAL_KEY] = budget
+
+    @app.before_request
+    def _admit():
+        if request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+        if not budget.acquire():
+            return overloaded(app)
+        request.environ[TOTAL_KEY] = budget
+        gate = gates.get(route_group(request.endpoint))
+        if gate is None:
+            return None
+        if not gate.acquire():
+            return overloaded(app)  # teardown gives the worker-wide slot back
+        request.environ[ENVIRON_KEY] = gate
+        return None
+
+    @app.after_request
+    def _hold_while_streaming(resp):
+        if resp.is_streamed:
+            for release in held_slots():
+                resp.call_on_close(release)  # the server closes the body when the stream ends
+        return resp
+
+    @app.teardown_request
+    def _release(exc):
+        for release in held_slots():
+            release()
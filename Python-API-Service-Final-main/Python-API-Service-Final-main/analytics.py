@@ -0,0 +1,70 @@
+"""Incrementally maintained product sales counters.
+
+A sale is an order line whose order is paid or delivered, the same definition
+report_sale uses for revenue. An order's lines are added to ProductSales when
+its status enters COUNTED_STATUSES and taken back out when it leaves, in the
+transaction that changes the status. Best-seller and category revenue reports
+therefore never scan OrderDetail. Pending (unpaid) checkouts are not counted.
+`flask analytics-reconcile` rebuilds the counters exactly from order history.
+"""
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, text
+
+from dialects import is_postgres, upsert_product_sales
+from extensions import db
+from models import Order, OrderDetail, ProductSales
+
+COUNTED_STATUSES = ("paid", "delivered")
+
+
+def record_sale(product_id, qty, price, sign=1):
+    """Add (or with sign=-1 remove) one order line; caller commits."""
+    upsert_product_sales(product_id, sign * qty, sign * qty * price)
+
+
+def record_status_change(order, old_status, new_status):
+    """Keep counters in line when an order enters or leaves a counted status."""
+    was_counted = old_status in COUNTED_STATUSES
+    is_counted = new_status in COUNTED_STATUSES
+    if was_counted == is_counted:
+        return
+    sign = 1 if is_counted else -1
+    for d in OrderDetail.query.filter_by(order_id=order.id).all():
+        record_sale(d.product_id, d.qty, d.price, sign)
+
+
+def reconcile():
+    """Recompute every counter from OrderDetail; returns the number of products.
+
+    Writers are locked out before the totals are read, so a checkout or
+    cancellation committing meanwhile either is in the totals or applies its
+    delta to the rebuilt counters afterwards, never neither.
+    """
+    if is_postgres():
+        # Conflicts with the row-exclusive lock every counter write takes
+        db.session.execute(text("LOCK TABLE product_sales IN EXCLUSIVE MODE"))
+    # On SQLite this first write takes the database write lock for the rest of the transaction
+    ProductSales.query.delete()
+    rows = (
+        db.session.query(
+            OrderDetail.product_id,
+            func.sum(OrderDetail.qty),
+            func.sum(OrderDetail.qty * OrderDetail.price),
+        )
+        .join(Order, Order.id == OrderDetail.order_id)
+        .filter(Order.status.in_(COUNTED_STATUSES))
+        .group_by(OrderDetail.product_id)
+        .all()
+    )
+    db.session.add_all(ProductSales(product_id=pid, qty=qty, revenue=revenue) for pid, qty, revenue in rows)
+    db.session.commit()
+    return len(rows)
+
+
+@click.command("analytics-reconcile")
+@with_appcontext
+def reconcile_command():
+    """Rebuild product sales counters from order history."""
+    count = reconcile()
+    click.echo(f"Reconciled sales counters for {count} products.")
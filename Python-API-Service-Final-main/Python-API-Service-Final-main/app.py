@@ -1,9 +1,16 @@
 from flask import Flask, jsonify
 from config import Config
 from extensions import db, migrate, jwt
+import compression
+import admission
+import profiling
+from analytics import reconcile_command
+from exports import export_orders_command
+from carts import sweep_carts_command
 
 from routes.front import front_bp
 from routes.admin import admin_bp
+from routes.batch import batch_bp
 
 
 def create_app():
@@ -13,9 +20,17 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    compression.init_app(app)
+    admission.init_app(app)
+    profiling.init_app(app)
 
     app.register_blueprint(front_bp, url_prefix="/api/front")
     app.register_blueprint(admin_bp, url_prefix="/api/admin")
+    app.register_blueprint(batch_bp, url_prefix="/api")
+
+    app.cli.add_command(reconcile_command)
+    app.cli.add_command(export_orders_command)
+    app.cli.add_command(sweep_carts_command)
 
     @app.get("/")
     def index():
@@ -24,6 +39,7 @@ def create_app():
             "health": "/health",
             "front_api": "/api/front",
             "admin_api": "/api/admin",
+            "batch_api": "/api/batch",
         }), 200
 
     @app.get("/health")
@@ -35,4 +51,5 @@ def create_app():
 app = create_app()
 
 if __name__ == "__main__":
+    # Development server only; use `python serve.py` in production
     app.run(debug=True)
@@ -0,0 +1,154 @@
+"""Abandoned-cart expiry.
+
+Every cart write touches updated_at on all lines of that cart, so a cart
+expires as a whole once it has been idle for CART_TTL_SECONDS. The sweeper
+deletes expired carts (all lines of a user) CART_SWEEP_BATCH carts at a time,
+each batch in its own short transaction, pausing CART_SWEEP_PAUSE seconds
+between batches so foreground writers are never queued behind it for long.
+
+Run a pass with `flask sweep-carts`, or let serve.py run one every
+CART_SWEEP_INTERVAL seconds in a single worker (the first one right after
+startup).
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, select
+from sqlalchemy.orm import aliased
+
+from extensions import db
+from models import CartItem
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOCK_RETRY_SECONDS = 60  # how often workers without the sweeper lock try to take it over
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def touch_cart(user_id):
+    """Mark the whole cart as active; caller commits."""
+    CartItem.query.filter_by(user_id=user_id).update({"updated_at": utcnow()}, synchronize_session=False)
+
+
+def sweep_expired_carts(ttl_seconds=None, batch_size=None, pause=None, max_batches=None):
+    """Delete carts idle for longer than the TTL; returns the number of rows reclaimed."""
+    config = current_app.config
+    ttl_seconds = config["CART_TTL_SECONDS"] if ttl_seconds is None else ttl_seconds
+    batch_size = config["CART_SWEEP_BATCH"] if batch_size is None else batch_size
+    pause = config["CART_SWEEP_PAUSE"] if pause is None else pause
+
+    cutoff = utcnow() - timedelta(seconds=ttl_seconds)
+    reclaimed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        # Whole carts only: a user qualifies when none of their lines is live, and the
+        # delete re-checks that, so a cart touched since the select keeps every line
+        live = aliased(CartItem)
+        expired = (
+            CartItem.updated_at < cutoff,
+            ~select(live.id).where(live.user_id == CartItem.user_id, live.updated_at >= cutoff).exists(),
+        )
+        user_ids = db.session.scalars(
+            select(CartItem.user_id).where(*expired).distinct().limit(batch_size)
+        ).all()
+        if not user_ids:
+            break
+        result = db.session.execute(delete(CartItem).where(CartItem.user_id.in_(user_ids), *expired))
+        db.session.commit()
+        reclaimed += result.rowcount
+        batches += 1
+        if len(user_ids) < batch_size:
+            break
+        time.sleep(pause)
+    return reclaimed
+
+
+def read_last_sweep(path):
+    """Wall-clock time of the last finished pass by any worker, or 0."""
+    try:
+        with open(path) as f:
+            return float(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def write_last_sweep(path, when):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{when:.0f}")
+    os.replace(tmp, path)
+
+
+def start_background_sweeper(app):
+    """Run sweep_expired_carts every CART_SWEEP_INTERVAL seconds in one worker only.
+
+    Every worker starts the thread; the one holding the lock file sweeps and the
+    others retry the lock every LOCK_RETRY_SECONDS, so the job moves on when
+    the owner is recycled. The time of the last pass is kept in a file, so a
+    new owner waits only for what is left of the interval (no wait on first run).
+    """
+    interval = app.config["CART_SWEEP_INTERVAL"]
+    if not interval or not fcntl:
+        return None
+
+    os.makedirs(app.instance_path, exist_ok=True)
+    lock_path = os.path.join(app.instance_path, "cart-sweeper.lock")
+    last_path = os.path.join(app.instance_path, "cart-sweeper.last")
+    retry = min(interval, LOCK_RETRY_SECONDS)
+
+    def acquire():
+        lock = open(lock_path, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None  # another worker owns the sweeper
+        app.logger.info("worker %s runs the cart sweeper", os.getpid())
+        return lock
+
+    def run():
+        lock = None
+        while True:
+            if lock is None:
+                lock = acquire()
+                if lock is None:
+                    time.sleep(retry)
+                    continue
+            wait = read_last_sweep(last_path) + interval - time.time()
+            if wait > 0:
+                time.sleep(min(wait, interval))
+                continue  # re-read: the file may have been updated meanwhile
+            with app.app_context():
+                try:
+                    reclaimed = sweep_expired_carts()
+                    app.logger.info("cart sweeper reclaimed %d rows", reclaimed)
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("cart sweep failed")
+                finally:
+                    db.session.remove()
+            write_last_sweep(last_path, time.time())  # failed passes too: retry next interval, not in a loop
+
+    thread = threading.Thread(target=run, name="cart-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+
+@click.command("sweep-carts")
+@click.option("--ttl", type=int, default=None, help="Idle seconds before a cart expires (default CART_TTL_SECONDS).")
+@with_appcontext
+def sweep_carts_command(ttl):
+    """Delete abandoned carts in small batches."""
+    reclaimed = sweep_expired_carts(ttl_seconds=ttl)
+    click.echo(f"Reclaimed {reclaimed} cart rows.")
@@ -0,0 +1,111 @@
+"""Catalog version counter and conditional GET support for catalog endpoints.
+
+The version lives in a small file so every worker process sees the same value
+without a database round trip. Writers call bump_catalog_version() after
+committing changes to products, categories or stock.
+
+The file holds "version last_modified". last_modified is in whole seconds (the
+resolution of HTTP dates) and goes up by at least one second on every bump, so
+If-Modified-Since never matches a catalog that changed within the same second.
+"""
+import os
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, request
+
+from extensions import defer_until_commit
+
+try:
+    import fcntl
+except ImportError:  # Windows: bumps are not serialized across processes
+    fcntl = None
+
+
+def version_path():
+    path = current_app.config.get("CATALOG_VERSION_FILE")
+    if not path:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        path = os.path.join(current_app.instance_path, "catalog.version")
+    return path
+
+
+def parse_version(text):
+    """(version, last_modified seconds) from the file contents; (0, 0) if empty or invalid."""
+    parts = text.split()
+    try:
+        version = int(parts[0]) if parts else 0
+        last_modified = int(parts[1]) if len(parts) > 1 else 0
+    except ValueError:
+        return 0, 0
+    return version, last_modified
+
+
+def catalog_version():
+    """Return (version, last_modified) without touching the database."""
+    try:
+        with open(version_path()) as f:
+            version, last_modified = parse_version(f.read())
+    except FileNotFoundError:
+        return 0, None
+    if not last_modified:
+        return version, None
+    return version, datetime.fromtimestamp(last_modified, timezone.utc)
+
+
+def bump_catalog_version(stock_changed=None):
+    """Advance the version after a committed catalog write.
+
+    Pass the product ids for stock-only changes (checkout) so the shared
+    snapshot can be patched instead of rebuilt. Inside an atomic batch the bump
+    is held back until the outer transaction commits.
+    """
+    if defer_until_commit(bump_catalog_version, stock_changed):
+        return None
+
+    path = version_path()
+    with open(path, "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        version, last_modified = parse_version(f.read())
+        version += 1
+        last_modified = max(int(time.time()), last_modified + 1)
+        f.seek(0)
+        f.truncate()
+        f.write(f"{version} {last_modified}")
+        f.flush()
+        os.fsync(f.fileno())
+
+    from snapshot import refresh_snapshot  # snapshot imports this module
+    refresh_snapshot(version, stock_changed)
+    return version
+
+
+def catalog_cached(view):
+    """Serve 304 Not Modified when the client already has the current catalog."""
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        version, last_modified = catalog_version()
+        etag = f"catalog-{version}"
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            since = request.if_modified_since
+            not_modified = bool(since and last_modified and last_modified <= since)
+
+        if not_modified:
+            resp = current_app.response_class(status=304)
+        else:
+            resp = current_app.make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+
+        resp.set_etag(etag, weak=True)
+        if last_modified:
+            resp.last_modified = last_modified
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+    return decorated
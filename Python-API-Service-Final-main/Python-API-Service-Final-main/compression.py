@@ -0,0 +1,60 @@
+"""gzip / brotli response compression for responses above a size threshold."""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def choose_encoding(accept_encodings):
+    """The client's most preferred coding we support; on a tie, br before gzip.
+
+    Codings the client refuses with q=0 (directly or through "*;q=0") are never chosen.
+    """
+    return accept_encodings.best_match(["br", "gzip"] if brotli is not None else ["gzip"])
+
+
+def compress_response(resp, min_size, level):
+    if (
+        resp.status_code < 200
+        or resp.status_code in (204, 304)
+        or resp.direct_passthrough
+        or resp.is_streamed
+        or "Content-Encoding" in resp.headers
+    ):
+        return resp
+
+    resp.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.accept_encodings)
+    if not encoding:
+        return resp
+
+    data = resp.get_data()
+    if len(data) < min_size:
+        return resp
+
+    if encoding == "br":
+        data = brotli.compress(data, quality=min(level, 11))
+    else:
+        data = gzip.compress(data, compresslevel=min(level, 9), mtime=0)
+
+    resp.set_data(data)
+    resp.headers["Content-Encoding"] = encoding
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        # Strong validators must differ between representations
+        resp.set_etag(f"{etag}-{encoding}")
+    return resp
+
+
+def init_app(app):
+    @app.after_request
+    def _compress(resp):
+        return compress_response(
+            resp,
+            app.config.get("COMPRESS_MIN_SIZE", 1024),
+            app.config.get("COMPRESS_LEVEL", 6),
+        )
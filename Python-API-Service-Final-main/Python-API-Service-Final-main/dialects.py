@@ -0,0 +1,140 @@
+"""Dialect-specific fast paths, chosen from the bound engine at call time.
+
+PostgreSQL gets row locks, ON CONFLICT upserts, COPY bulk loads and server-side
+cursors; SQLite (development) and anything else use portable fallbacks.
+"""
+import csv
+import io
+import json
+
+from flask import Response, current_app, jsonify, stream_with_context
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import CartItem, Product, ProductSales
+
+
+def dialect_name():
+    return db.session.get_bind().dialect.name
+
+
+def is_postgres():
+    return dialect_name() == "postgresql"
+
+
+def lock_cart_items(user_id):
+    """The user's cart lines, locked on PostgreSQL so a concurrent checkout of the
+    same cart waits and then finds it empty."""
+    query = CartItem.query.filter_by(user_id=user_id).order_by(CartItem.id)
+    if is_postgres():
+        query = query.with_for_update()
+    return query.all()
+
+
+def lock_products(product_ids):
+    """Load products by id, row-locked until commit where the backend supports it.
+
+    Ids are locked in ascending order so concurrent checkouts cannot deadlock.
+    SQLite has no row locks; its single writer serializes checkouts instead.
+    """
+    query = Product.query.filter(Product.id.in_(product_ids)).order_by(Product.id)
+    if is_postgres():
+        query = query.with_for_update()
+    return {p.id: p for p in query.all()}
+
+
+def upsert_cart_item(user_id, product_id, qty):
+    """Add qty to the user's cart line, creating it if needed, in one statement."""
+    name = dialect_name()
+    if name in ("postgresql", "sqlite"):
+        module = postgresql if name == "postgresql" else sqlite
+        stmt = module.insert(CartItem).values(user_id=user_id, product_id=product_id, qty=qty)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CartItem.user_id, CartItem.product_id],
+            set_={"qty": CartItem.qty + stmt.excluded.qty},
+        )
+        db.session.execute(stmt)
+        return
+
+    updated = db.session.execute(
+        update(CartItem)
+        .where(CartItem.user_id == user_id, CartItem.product_id == product_id)
+        .values(qty=CartItem.qty + qty)
+    ).rowcount
+    if not updated:
+        db.session.add(CartItem(user_id=user_id, product_id=product_id, qty=qty))
+
+
+def upsert_product_sales(product_id, qty, revenue):
+    """Add to a product's sales counters, creating the row if needed, in one statement.
+
+    Concurrent first sales of a product both land on the same row instead of one
+    checkout failing on the unique product_id.
+    """
+    name = dialect_name()
+    if name in ("postgresql", "sqlite"):
+        module = postgresql if name == "postgresql" else sqlite
+        stmt = module.insert(ProductSales).values(product_id=product_id, qty=qty, revenue=revenue)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProductSales.product_id],
+            set_={"qty": ProductSales.qty + stmt.excluded.qty, "revenue": ProductSales.revenue + stmt.excluded.revenue},
+        )
+        db.session.execute(stmt)
+        return
+
+    updated = db.session.execute(
+        update(ProductSales)
+        .where(ProductSales.product_id == product_id)
+        .values(qty=ProductSales.qty + qty, revenue=ProductSales.revenue + revenue)
+    ).rowcount
+    if not updated:
+        db.session.add(ProductSales(product_id=product_id, qty=qty, revenue=revenue))
+
+
+def bulk_insert_products(rows):
+    """Insert product dicts and return their new ids in the same order; caller commits."""
+    if not rows:
+        return []
+    if not is_postgres():
+        return list(db.session.scalars(
+            insert(Product).returning(Product.id, sort_by_parameter_order=True), rows
+        ))
+
+    ids = list(db.session.scalars(
+        select(db.func.nextval("product_id_seq")).select_from(db.func.generate_series(1, len(rows)))
+    ))
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for pid, row in zip(ids, rows):
+        writer.writerow([pid, row["category_id"], row["name"], row["price"], row["stock"], row["description"]])
+    buf.seek(0)
+
+    cursor = db.session.connection().connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY product (id, category_id, name, price, stock, description) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cursor.close()
+    return ids
+
+
+def json_list_response(stmt, serialize):
+    """JSON array of serialize(row) for an ORM select.
+
+    On PostgreSQL rows are streamed from a server-side cursor in batches of
+    EXPORT_YIELD_PER; elsewhere the list is built in memory as before.
+    """
+    if not is_postgres():
+        return jsonify([serialize(row) for row in db.session.scalars(stmt)]), 200
+
+    def generate():
+        rows = db.session.scalars(stmt.execution_options(yield_per=current_app.config["EXPORT_YIELD_PER"]))
+        yield "["
+        for i, row in enumerate(rows):
+            yield ("," if i else "") + json.dumps(serialize(row))
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
@@ -0,0 +1,183 @@
+"""Per-user order events pushed over Server-Sent Events.
+
+publish() appends to a small SQLite log next to the app (not the main
+database), which doubles as the cross-worker transport: one poller thread per
+worker reads new rows every EVENTS_POLL_SECONDS and fans them out to the
+in-process subscriber queues of that user. Event ids are the log's row ids, so
+a reconnecting client sends Last-Event-ID and gets everything it missed within
+EVENTS_RETENTION_SECONDS.
+
+A fresh connection starts at the user's current tail; only a client resuming
+with Last-Event-ID gets missed events replayed. The first message of a fresh
+stream carries the tail id, so even a client that saw no events can resume.
+
+Each open stream holds a worker thread, so serve with SERVE_THREADS > 1 (the
+default). The "events" admission group caps open streams per worker (2 of the
+8 default threads) so streams cannot take the threads other routes need; an
+extra connection gets 503 with Retry-After, after which the client reconnects
+or falls back to polling tracking-order. On sync workers (SERVE_THREADS=1)
+streams are cut to half of SERVE_TIMEOUT so gunicorn does not kill the worker
+mid-stream.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+from extensions import defer_until_commit
+
+_local = threading.local()
+
+
+def storage_path():
+    path = current_app.config.get("EVENTS_STORAGE")
+    if not path:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        path = os.path.join(current_app.instance_path, "events.sqlite")
+    return path
+
+
+def connect(path):
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != path or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS event (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_id INTEGER NOT NULL, type TEXT NOT NULL, data TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_event_user_id ON event (user_id, id)")
+        _local.conn, _local.path, _local.pid = conn, path, os.getpid()
+    return conn
+
+
+def publish(user_id, type, data):
+    """Record an event for user_id; held back until commit inside an atomic batch."""
+    if defer_until_commit(publish, user_id, type, data):
+        return
+    try:
+        connect(storage_path()).execute(
+            "INSERT INTO event (user_id, type, data, created) VALUES (?, ?, ?, ?)",
+            (user_id, type, json.dumps(data), time.time()),
+        )
+    except sqlite3.Error:
+        current_app.logger.exception("order event publish failed")
+
+
+def tail(path, user_id):
+    return connect(path).execute("SELECT COALESCE(MAX(id), 0) FROM event WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+def replay(path, user_id, after_id):
+    rows = connect(path).execute(
+        "SELECT id, type, data FROM event WHERE user_id = ? AND id > ? ORDER BY id", (user_id, after_id)
+    )
+    return [(row_id, type, json.loads(data)) for row_id, type, data in rows]
+
+
+class Broker:
+    """In-process fan-out from the shared log to subscriber queues."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}  # user_id -> set of queues
+        self.pid = None
+
+    def subscribe(self, path, poll_seconds, retention_seconds, user_id):
+        q = queue.Queue(maxsize=1000)
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(q)
+            if self.pid != os.getpid():
+                # Start after the current tail; older events reach clients through replay()
+                self.pid = os.getpid()
+                last_id = connect(path).execute("SELECT COALESCE(MAX(id), 0) FROM event").fetchone()[0]
+                thread = threading.Thread(
+                    target=self.poll, args=(path, poll_seconds, retention_seconds, last_id), daemon=True
+                )
+                thread.start()
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self.lock:
+            queues = self.subscribers.get(user_id)
+            if queues:
+                queues.discard(q)
+                if not queues:
+                    del self.subscribers[user_id]
+
+    def poll(self, path, poll_seconds, retention_seconds, last_id):
+        conn = connect(path)
+        next_prune = 0.0
+        while True:
+            time.sleep(poll_seconds)
+            try:
+                rows = conn.execute(
+                    "SELECT id, user_id, type, data FROM event WHERE id > ? ORDER BY id", (last_id,)
+                ).fetchall()
+                for row_id, user_id, type, data in rows:
+                    last_id = row_id
+                    with self.lock:
+                        queues = list(self.subscribers.get(user_id, ()))
+                    for q in queues:
+                        try:
+                            q.put_nowait((row_id, type, json.loads(data)))
+                        except queue.Full:
+                            pass  # slow client; it resumes from Last-Event-ID on reconnect
+
+                now = time.time()
+                if now >= next_prune:
+                    conn.execute("DELETE FROM event WHERE created < ?", (now - retention_seconds,))
+                    next_prune = now + 60
+            except sqlite3.Error:
+                time.sleep(poll_seconds)
+
+
+broker = Broker()
+
+
+def format_event(event_id, type, data):
+    return f"id: {event_id}\nevent: {type}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(user_id, last_event_id):
+    """SSE body for one client; ends after EVENTS_STREAM_SECONDS so the client reconnects.
+
+    last_event_id is None for a fresh connection, which starts at the current tail.
+    """
+    config = current_app.config
+    path = storage_path()
+    keepalive = config["EVENTS_KEEPALIVE_SECONDS"]
+    duration = config["EVENTS_STREAM_SECONDS"]
+    if config["SERVE_THREADS"] < 2:
+        duration = min(duration, config["SERVE_TIMEOUT"] / 2)
+
+    def generate():
+        q = broker.subscribe(path, config["EVENTS_POLL_SECONDS"], config["EVENTS_RETENTION_SECONDS"], user_id)
+        deadline = time.monotonic() + duration
+        try:
+            yield f"retry: {int(config['EVENTS_RETRY_MS'])}\n\n"
+            if last_event_id is None:
+                sent = tail(path, user_id)
+                yield f"id: {sent}\n\n"  # sets the client's Last-Event-ID for its next reconnect
+            else:
+                sent = last_event_id
+                for event in replay(path, user_id, sent):
+                    sent = event[0]
+                    yield format_event(*event)
+            while time.monotonic() < deadline:
+                try:
+                    event = q.get(timeout=min(keepalive, max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event[0] > sent:
+                    sent = event[0]
+                    yield format_event(*event)
+        finally:
+            broker.unsubscribe(user_id, q)
+
+    return generate()
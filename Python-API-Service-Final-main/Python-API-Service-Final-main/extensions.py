@@ -1,3 +1,5 @@
+from flask import g
+from sqlalchemy import orm
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
@@ -5,3 +7,51 @@ from flask_jwt_extended import JWTManager
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
+
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    from revocation import store  # imports models, which need db
+    return store.is_revoked(jwt_payload["jti"])
+
+
+def defer_until_commit(fn, *args, **kwargs):
+    """Hold a side effect back while an outer transaction is open.
+
+    Atomic /api/batch and Idempotency-Key requests run views in one outer
+    transaction. Returns True if deferred; the owner of that transaction runs
+    it after its commit or drops it on rollback. Otherwise returns False and
+    the caller goes ahead.
+    """
+    deferred = g.get("after_commit")
+    if deferred is None:
+        return False
+    deferred.append((fn, args, kwargs))
+    return True
+
+
+def transactional_session():
+    """Session inside one outer transaction; the views' commits become savepoints."""
+    conn = db.engine.connect()
+    dbapi_conn = conn.connection.driver_connection
+    sqlite = conn.dialect.name == "sqlite"
+    if sqlite:
+        # pysqlite manages BEGIN itself and breaks SAVEPOINT; take control for this connection
+        isolation_level = dbapi_conn.isolation_level
+        dbapi_conn.isolation_level = None
+    trans = conn.begin()
+    if sqlite:
+        conn.exec_driver_sql("BEGIN")
+
+    def finish(commit):
+        session.close()
+        if commit:
+            trans.commit()
+        else:
+            trans.rollback()
+        if sqlite:
+            dbapi_conn.isolation_level = isolation_level
+        conn.close()
+
+    session = orm.Session(bind=conn, join_transaction_mode="create_savepoint")
+    return session, finish
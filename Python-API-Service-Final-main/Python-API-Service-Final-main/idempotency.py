@@ -0,0 +1,168 @@
+"""Idempotency-Key support for write endpoints.
+
+The first request with a given key (per user and endpoint) runs the view in
+one outer transaction, as an atomic /api/batch does: the view's commits become
+savepoints, and the key row with the stored response is written in that same
+transaction. The view's writes and the stored response commit together or not
+at all. A worker that dies mid-request leaves neither behind, so a retry runs
+the view exactly once.
+
+Retries with the same key get the stored response back for
+IDEMPOTENCY_TTL_SECONDS without running the view again. A retry that arrives
+while the first attempt is still running waits on the key's unique index, then
+gets the stored response. Reusing a key with a different request body is
+rejected with 422. Server errors roll the whole attempt back, so it can be
+retried. Expired keys are deleted by a background thread per worker, never on
+the request path.
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import current_app, g, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db, transactional_session
+from models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+_pruner = {"pid": None}
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def fingerprint():
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.full_path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def stored_response(row):
+    resp = current_app.response_class(row.response_body, status=row.status_code, mimetype=row.mimetype)
+    resp.headers["Idempotent-Replayed"] = "true"
+    return resp
+
+
+def replay(scope, key, request_hash, now):
+    """Response for a key that is already stored and live, else None."""
+    row = IdempotencyKey.query.filter_by(scope=scope, key=key).first()
+    if row is None or row.expires_at < now:
+        return None
+    if row.request_hash != request_hash:
+        return jsonify({"message": f"{HEADER} reused with a different request"}), 422
+    return stored_response(row)
+
+
+def in_progress():
+    resp = jsonify({"message": "a request with this Idempotency-Key is in progress"})
+    resp.status_code = 409
+    resp.headers["Retry-After"] = "1"
+    return resp
+
+
+def prune_rows():
+    """Delete expired keys on a connection of their own; returns the row count."""
+    with db.engine.begin() as conn:
+        return conn.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < utcnow())).rowcount
+
+
+def start_pruner(app):
+    """Run prune_rows every IDEMPOTENCY_PRUNE_SECONDS in this worker."""
+    interval = app.config["IDEMPOTENCY_PRUNE_SECONDS"]
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    prune_rows()
+                except Exception:
+                    app.logger.exception("idempotency key prune failed")
+
+    threading.Thread(target=run, name="idempotency-pruner", daemon=True).start()
+
+
+def idempotent(view):
+    """Honour an Idempotency-Key header; place below @jwt_required()."""
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"message": f"{HEADER} too long"}), 400
+
+        if _pruner["pid"] != os.getpid():
+            _pruner["pid"] = os.getpid()
+            start_pruner(current_app._get_current_object())
+
+        config = current_app.config
+        scope = f"{get_jwt_identity()}:{request.endpoint}"
+        request_hash = fingerprint()
+        now = utcnow()
+
+        stored = replay(scope, key, request_hash, now)
+        if stored is not None:
+            return stored
+
+        # Inside an atomic batch the batch's transaction is already ours, and it
+        # rolls back as a whole when this returns an error.
+        nested = g.get("after_commit") is not None
+        if not nested:
+            db.session.remove()
+            session, finish = transactional_session()
+            db.session.registry.set(session)
+            g.after_commit = []
+
+        commit, conflict, resp = False, False, None
+        try:
+            # An expired row for the key is replaced in the same transaction
+            IdempotencyKey.query.filter(
+                IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.expires_at < now,
+            ).delete()
+            row = IdempotencyKey(
+                scope=scope,
+                key=key,
+                request_hash=request_hash,
+                created_at=now,
+                expires_at=now + timedelta(seconds=config["IDEMPOTENCY_TTL_SECONDS"]),
+            )
+            db.session.add(row)
+            try:
+                db.session.flush()  # takes the key; a concurrent attempt waits here until this one ends
+            except IntegrityError:
+                conflict = True  # an attempt with this key committed since the lookup above
+            else:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code < 500 and not resp.is_streamed:
+                    row.status_code = resp.status_code
+                    row.response_body = resp.get_data(as_text=True)
+                    row.mimetype = resp.mimetype
+                    db.session.commit()  # releases a savepoint; the outer transaction commits below
+                    commit = True
+                elif nested:
+                    db.session.delete(row)
+                    db.session.commit()
+        finally:
+            if not nested:
+                db.session.registry.clear()
+                finish(commit=commit)
+                deferred = g.pop("after_commit")
+
+        if not nested and commit:
+            for fn, fn_args, fn_kwargs in deferred:
+                fn(*fn_args, **fn_kwargs)
+        if conflict:
+            if nested:
+                return in_progress()
+            return replay(scope, key, request_hash, utcnow()) or in_progress()
+        return resp
+    return decorated
@@ -1,21 +1,44 @@
+import re
 from datetime import datetime, timezone
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from extensions import db
 
+
+def name_tokens(name):
+    """Case-folded words of a name, as stored in UserNameToken and matched by admin search."""
+    return sorted(set(re.findall(r"\w+", (name or "").casefold())))
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     email = db.Column(db.String(180), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(20), default="customer")  # customer/admin
+    role = db.Column(db.String(20), default="customer", index=True)  # customer/admin
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # Words of the name for admin search; rebuilt whenever name is assigned
+    search_tokens = db.relationship("UserNameToken", cascade="all, delete-orphan")
+
+    @validates("name")
+    def _index_name(self, key, value):
+        self.search_tokens = [UserNameToken(token=t) for t in name_tokens(value)]
+        return value
+
     def set_password(self, password: str):
         self.password_hash = generate_password_hash(password)
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
 
+class UserNameToken(db.Model):
+    """One case-folded word of a user's name; admin search matches word prefixes here."""
+    __table_args__ = (db.Index("ix_user_name_token_token_user_id", "token", "user_id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    token = db.Column(db.String(120), nullable=False)
+
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False, unique=True)
@@ -32,10 +55,15 @@ class Product(db.Model):
     category = db.relationship("Category")
 
 class CartItem(db.Model):
+    # One line per product per cart (upsert target); also serves user_id-only lookups
+    __table_args__ = (db.Index("ix_cart_item_user_id_product_id", "user_id", "product_id", unique=True),)
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
     qty = db.Column(db.Integer, nullable=False, default=1)
+    # Last time the owning cart changed; every line of a cart is touched together
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
     user = db.relationship("User")
     product = db.relationship("Product")
@@ -44,17 +72,49 @@ class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
     total = db.Column(db.Float, default=0)
-    status = db.Column(db.String(30), default="pending")  # pending/paid/shipped/delivered/cancelled
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    status = db.Column(db.String(30), default="pending", index=True)  # pending/paid/shipped/delivered/cancelled
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)  # export date range
 
     user = db.relationship("User")
 
 class OrderDetail(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False, index=True)
-    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False, index=True)
     qty = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
 
     order = db.relationship("Order")
     product = db.relationship("Product")
+
+class ProductSales(db.Model):
+    """Running sales totals per product, maintained by checkout."""
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), primary_key=True)
+    qty = db.Column(db.Integer, nullable=False, default=0, index=True)
+    revenue = db.Column(db.Float, nullable=False, default=0, index=True)
+
+    product = db.relationship("Product")
+
+class RevokedToken(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    # Naive UTC; workers sync by this (with overlap), not by id
+    created_at = db.Column(
+        db.DateTime, nullable=False, index=True,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+
+class IdempotencyKey(db.Model):
+    """Stored response for a client-supplied Idempotency-Key, committed with the view's writes."""
+    __table_args__ = (db.UniqueConstraint("scope", "key"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(120), nullable=False)  # user + endpoint
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
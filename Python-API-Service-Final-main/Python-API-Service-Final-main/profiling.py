@@ -0,0 +1,243 @@
+"""On-demand sampling profiler for live workers.
+
+Off by default. PROFILING_ENABLED and PROFILE_SAMPLE_RATE are only the initial
+settings: PUT /api/admin/profile/settings changes them at runtime for every
+worker, through a small file each worker re-reads at most every POLL_SECONDS.
+While profiling is off a request pays one clock read and a comparison.
+When enabled, a sample-rate fraction of requests is profiled, plus any
+request sent with the PROFILE_HEADER header by an admin. One sampler thread per
+worker reads the stack of every profiled request thread each PROFILE_INTERVAL
+seconds (sys._current_frames), so profiled requests are not slowed by tracing
+and others pay nothing. Stacks are aggregated per endpoint in memory and served
+by /api/admin/profile as top-N functions and in collapsed-stack format for
+flamegraph.pl or speedscope. Each worker keeps its own profile.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from models import User
+
+ENVIRON_KEY = "profiling.endpoint"
+TRUNCATED = "[truncated]"
+POLL_SECONDS = 1.0
+
+
+def frame_name(code):
+    filename = code.co_filename
+    base = os.path.basename(filename)
+    if base == "__init__.py":
+        base = os.path.join(os.path.basename(os.path.dirname(filename)), base)
+    return f"{code.co_name} ({base}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class Settings:
+    """Enabled flag and sample rate, shared by the workers through a settings file.
+
+    Without the file the configured defaults apply. A worker notices a change
+    within POLL_SECONDS; the worker that made it sees it at once.
+    """
+
+    def __init__(self, path, enabled, rate):
+        self.path = path
+        self.defaults = (enabled, rate)
+        self.enabled, self.rate = self.defaults
+        self.stamp = None
+        self.next_poll = 0.0
+
+    def poll(self):
+        now = time.monotonic()
+        if now < self.next_poll:
+            return
+        self.next_poll = now + POLL_SECONDS
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            stamp = None
+        if stamp == self.stamp:
+            return
+        self.stamp = stamp
+        if stamp is None:
+            self.enabled, self.rate = self.defaults
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.enabled, self.rate = bool(data["enabled"]), float(data["sample_rate"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # keep the previous settings
+
+    def update(self, enabled, rate):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"enabled": enabled, "sample_rate": rate}, f)
+        os.replace(tmp, self.path)
+        self.enabled, self.rate = enabled, rate
+        self.next_poll = 0.0
+
+    def as_dict(self):
+        return {"enabled": self.enabled, "sample_rate": self.rate}
+
+
+class Profiler:
+    def __init__(self, interval, max_stacks):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.active = {}  # thread ident -> endpoint
+        self.stacks = {}  # endpoint -> Counter of collapsed stacks
+        self.requests = Counter()
+        self.pid = None
+
+    def start(self, endpoint):
+        with self.lock:
+            self.active[threading.get_ident()] = endpoint
+            if self.pid != os.getpid():
+                # First profiled request in this process (also after a fork)
+                self.pid = os.getpid()
+                threading.Thread(target=self.run, name="profiler", daemon=True).start()
+            self.wake.set()
+
+    def stop(self):
+        with self.lock:
+            endpoint = self.active.pop(threading.get_ident(), None)
+            if endpoint is not None:
+                self.requests[endpoint] += 1
+
+    def run(self):
+        me = threading.get_ident()
+        while True:
+            self.wake.wait()
+            time.sleep(self.interval)
+            with self.lock:
+                targets = dict(self.active)
+                if not targets:
+                    self.wake.clear()
+                    continue
+            frames = sys._current_frames()
+            samples = [(endpoint, collapse(frames[ident])) for ident, endpoint in targets.items()
+                       if ident != me and ident in frames]
+            with self.lock:
+                for endpoint, stack in samples:
+                    counts = self.stacks.setdefault(endpoint, Counter())
+                    if stack not in counts and len(counts) >= self.max_stacks:
+                        stack = TRUNCATED
+                    counts[stack] += 1
+
+    def reset(self):
+        with self.lock:
+            self.stacks.clear()
+            self.requests.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {endpoint: Counter(counts) for endpoint, counts in self.stacks.items()}, Counter(self.requests)
+
+    def summary(self, top):
+        stacks, requests = self.snapshot()
+        endpoints = {}
+        for endpoint in sorted(set(stacks) | set(requests)):
+            counts = stacks.get(endpoint, Counter())
+            endpoints[endpoint] = {
+                "requests": requests[endpoint],
+                "samples": sum(counts.values()),
+                "top": top_functions(counts, top),
+            }
+        return endpoints
+
+    def collapsed(self, endpoint=None):
+        """Collapsed stacks rooted at the endpoint name, one "frames count" line each."""
+        stacks, _ = self.snapshot()
+        lines = []
+        for name in sorted(stacks):
+            if endpoint and name != endpoint:
+                continue
+            for stack, count in stacks[name].most_common():
+                lines.append(f"{name};{stack} {count}\n")
+        return "".join(lines)
+
+
+def top_functions(counts, n):
+    """Functions by self samples (leaf frame) and total samples (anywhere on the stack)."""
+    own = Counter()
+    total = Counter()
+    samples = sum(counts.values())
+    for stack, count in counts.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for name in set(frames):
+            total[name] += count
+    return [
+        {
+            "function": name,
+            "self": own[name],
+            "total": total[name],
+            "self_pct": round(100.0 * own[name] / samples, 1),
+            "total_pct": round(100.0 * total[name] / samples, 1),
+        }
+        for name, _ in own.most_common(n)
+    ]
+
+
+def requested_by_admin():
+    try:
+        verify_jwt_in_request()
+        u = User.query.get(int(get_jwt_identity()))
+    except Exception:
+        return False
+    return bool(u and u.role == "admin")
+
+
+def profiler():
+    return current_app.extensions.get("profiler")
+
+
+def init_app(app):
+    prof = Profiler(app.config["PROFILE_INTERVAL"], app.config["PROFILE_MAX_STACKS"])
+    prof.settings = Settings(
+        app.config.get("PROFILE_SETTINGS_FILE") or os.path.join(app.instance_path, "profiling.settings"),
+        bool(app.config.get("PROFILING_ENABLED")),
+        app.config["PROFILE_SAMPLE_RATE"],
+    )
+    app.extensions["profiler"] = prof
+    header = app.config["PROFILE_HEADER"]
+    settings = prof.settings
+
+    @app.before_request
+    def _start_profile():
+        settings.poll()
+        if not settings.enabled:
+            return None
+        endpoint = request.endpoint
+        if not endpoint or endpoint.startswith("admin.profile"):
+            return None
+        rate = settings.rate
+        if not (rate and random.random() < rate) and not (header in request.headers and requested_by_admin()):
+            return None
+        request.environ[ENVIRON_KEY] = endpoint
+        prof.start(endpoint)
+        return None
+
+    @app.teardown_request
+    def _stop_profile(exc):
+        if request.environ.pop(ENVIRON_KEY, None) is not None:
+            prof.stop()
@@ -0,0 +1,104 @@
+"""Token-bucket rate limiting shared across worker processes.
+
+Buckets are kept in a local SQLite file (not the app database), keyed by
+endpoint + client IP and endpoint + email. Limits come from Config.RATELIMITS
+as "N/seconds": a bucket holds N tokens and refills N tokens per window.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+_local = threading.local()
+PRUNE_EVERY = 1000
+
+
+def parse_limit(value):
+    count, seconds = value.split("/")
+    return float(count), float(count) / float(seconds)
+
+
+def storage_path():
+    path = current_app.config.get("RATELIMIT_STORAGE")
+    if not path:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        path = os.path.join(current_app.instance_path, "ratelimit.sqlite")
+    return path
+
+
+def get_conn():
+    path = storage_path()
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != path or getattr(_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        _local.conn, _local.path, _local.pid, _local.calls = conn, path, os.getpid(), 0
+    return conn
+
+
+def take(keys, capacity, rate):
+    """Take one token from every bucket in keys.
+
+    Returns 0 when allowed, otherwise the seconds until a token is available.
+    Nothing is consumed when any bucket is empty.
+    """
+    conn = get_conn()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        levels = {}
+        for key in keys:
+            row = conn.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            levels[key] = tokens
+
+        short = [tokens for tokens in levels.values() if tokens < 1]
+        wait = max((1 - tokens) / rate for tokens in short) if short else 0
+        if not wait:
+            conn.executemany(
+                "INSERT OR REPLACE INTO bucket (key, tokens, updated) VALUES (?, ?, ?)",
+                [(key, tokens - 1, now) for key, tokens in levels.items()],
+            )
+
+        _local.calls += 1
+        if _local.calls % PRUNE_EVERY == 0:
+            # Buckets idle for a day are full again; dropping them changes nothing
+            conn.execute("DELETE FROM bucket WHERE updated < ?", (now - 86400,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return wait
+
+
+def rate_limited(f):
+    """Reject with 429 before the view runs any hashing or DB lookup."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        limit = current_app.config.get("RATELIMITS", {}).get(request.endpoint)
+        if not current_app.config.get("RATELIMIT_ENABLED", True) or not limit:
+            return f(*args, **kwargs)
+
+        capacity, rate = parse_limit(limit)
+        keys = [f"{request.endpoint}:ip:{request.remote_addr}"]
+        data = request.get_json(silent=True)
+        email = (data.get("email") or "").strip().lower() if isinstance(data, dict) else ""
+        if email:
+            keys.append(f"{request.endpoint}:email:{email}")
+
+        wait = take(keys, capacity, rate)
+        if wait:
+            resp = jsonify({"message": "too many requests"})
+            resp.status_code = 429
+            resp.headers["Retry-After"] = str(math.ceil(wait))
+            return resp
+        return f(*args, **kwargs)
+    return decorated
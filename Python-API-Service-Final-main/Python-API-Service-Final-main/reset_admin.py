@@ -5,7 +5,10 @@ from models import User
 
 with app.app_context():
     # Delete existing admin (any user with this email)
-    deleted = User.query.filter_by(email="admin@example.com").delete()
+    # Through the session, not a bulk delete, so the user's name tokens go too
+    deleted = User.query.filter_by(email="admin@example.com").all()
+    for u in deleted:
+        db.session.delete(u)
     db.session.commit()
     if deleted:
         print("Removed existing admin user.")
@@ -0,0 +1,159 @@
+"""Revoked JWT store checked on every @jwt_required() request.
+
+Revoked jtis are persisted in RevokedToken and mirrored in memory by each
+worker: a Bloom filter answers the common "not revoked" case and an exact set
+settles Bloom hits. Every REVOCATION_SYNC_SECONDS a worker re-reads the rows
+created since its previous sync started, minus REVOCATION_SYNC_OVERLAP seconds.
+Ids are not used as a cursor because concurrent logouts can commit out of id
+order; the overlap absorbs late commits and clock skew between hosts.
+
+Expired entries are dropped from memory every REVOCATION_PRUNE_SECONDS; a
+background thread per worker deletes the expired rows on its own connection,
+never inside a request's session.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import delete, select
+
+from extensions import db
+from models import RevokedToken
+
+BLOOM_FP_RATE = 0.01
+
+
+class BloomFilter:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(BLOOM_FP_RATE) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # jti -> expires_at (naive UTC)
+        self.bloom = None
+        self.synced_until = None  # start of the last sync (naive UTC)
+        self.next_sync = 0.0
+        self.next_prune = 0.0
+        self.pruner_pid = None
+
+    def _rebuild(self, capacity):
+        """Replace the filter with one holding every entry; caller holds the lock.
+
+        is_revoked() reads self.bloom without the lock, so the new filter is
+        filled first and published in one assignment.
+        """
+        while capacity < len(self.entries):
+            capacity *= 2
+        bloom = BloomFilter(capacity)
+        for jti in self.entries:
+            bloom.add(jti)
+        self.bloom = bloom
+
+    def _add(self, jti, expires_at):
+        self.entries[jti] = expires_at
+        if len(self.entries) > self.bloom.capacity:
+            self._rebuild(self.bloom.capacity * 2)
+        else:
+            self.bloom.add(jti)
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and now < self.next_sync:
+            return
+        config = current_app.config
+        with self.lock:
+            if not force and time.monotonic() < self.next_sync:
+                return  # another thread synced while this one waited for the lock
+            if self.bloom is None:
+                self._rebuild(config["REVOCATION_BLOOM_CAPACITY"])
+            if self.pruner_pid != os.getpid():
+                self.pruner_pid = os.getpid()
+                start_pruner(current_app._get_current_object())
+
+            started = utcnow()
+            stmt = select(RevokedToken.jti, RevokedToken.expires_at)
+            if self.synced_until is None:
+                stmt = stmt.where(RevokedToken.expires_at >= started)  # first load: live entries only
+            else:
+                overlap = timedelta(seconds=config["REVOCATION_SYNC_OVERLAP"])
+                stmt = stmt.where(RevokedToken.created_at >= self.synced_until - overlap)
+            for jti, expires_at in db.session.execute(stmt).all():
+                if jti not in self.entries:
+                    self._add(jti, expires_at)
+            self.synced_until = started
+
+            if now >= self.next_prune:
+                self.prune()
+                self.next_prune = now + config["REVOCATION_PRUNE_SECONDS"]
+            self.next_sync = now + config["REVOCATION_SYNC_SECONDS"]
+
+    def prune(self):
+        """Drop expired entries from memory; rows are deleted by the pruner thread."""
+        cutoff = utcnow()
+        self.entries = {jti: exp for jti, exp in self.entries.items() if exp >= cutoff}
+        self._rebuild(current_app.config["REVOCATION_BLOOM_CAPACITY"])
+
+    def is_revoked(self, jti):
+        self.sync()
+        return jti in self.bloom and jti in self.entries
+
+    def revoke(self, jti, exp=None):
+        if exp is None:  # non-expiring token: keep the entry for good
+            expires_at = datetime.max
+        else:
+            expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+        if not RevokedToken.query.filter_by(jti=jti).first():
+            db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+            db.session.commit()
+        self.sync(force=True)
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def prune_rows():
+    """Delete expired RevokedToken rows on a connection of their own; returns the row count."""
+    with db.engine.begin() as conn:
+        return conn.execute(delete(RevokedToken).where(RevokedToken.expires_at < utcnow())).rowcount
+
+
+def start_pruner(app):
+    """Delete expired RevokedToken rows every REVOCATION_PRUNE_SECONDS on a separate connection."""
+    interval = app.config["REVOCATION_PRUNE_SECONDS"]
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    prune_rows()
+                except Exception:
+                    app.logger.exception("revoked token prune failed")
+
+    threading.Thread(target=run, name="revocation-pruner", daemon=True).start()
+
+
+store = RevocationStore()
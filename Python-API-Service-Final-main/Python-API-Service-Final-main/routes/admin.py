@@ -1,7 +1,21 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
+import os
+import sys
+
+from flask import Blueprint, current_app, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, create_access_token
+from sqlalchemy import false, func, select
 from extensions import db
-from models import User, Category, Product, Order, OrderDetail
+from catalog import bump_catalog_version
+from ratelimit import rate_limited
+from models import User, UserNameToken, Category, Product, Order, OrderDetail, ProductSales, name_tokens
+from analytics import COUNTED_STATUSES, record_status_change
+import revocation
+import exports
+from dialects import bulk_insert_products, json_list_response
+import admission
+import profiling
+import events
+from idempotency import idempotent
 
 admin_bp = Blueprint("admin", __name__)
 
@@ -23,6 +37,7 @@ def require_admin():
 # Auth
 # -----------------------
 @admin_bp.post("/auth/login")
+@rate_limited
 def admin_login():
     data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
@@ -39,7 +54,10 @@ def admin_login():
 
 
 @admin_bp.post("/auth/logout")
+@jwt_required()
 def admin_logout():
+    token = get_jwt()
+    revocation.store.revoke(token["jti"], token.get("exp"))
     return jsonify({"message": "admin logout success"}), 200
 
 
@@ -51,8 +69,64 @@ def admin_logout():
 def users_list():
     if not require_admin():
         return jsonify({"message": "forbidden"}), 403
-    rows = User.query.order_by(User.id.desc()).all()
-    return jsonify([{"id": u.id, "name": u.name, "email": u.email, "role": u.role} for u in rows]), 200
+
+    email = (request.args.get("email") or "").strip().lower()
+    name = (request.args.get("name") or "").strip()
+    role = (request.args.get("role") or "").strip()
+    try:
+        page = max(1, int(request.args.get("page", 1)))
+        per_page = min(200, max(1, int(request.args.get("per_page", 50))))
+    except (TypeError, ValueError):
+        return jsonify({"message": "page and per_page must be numbers"}), 400
+
+    query = User.query
+    # Prefix ranges instead of LIKE so the email and name-token indexes are used on every backend
+    if email:
+        query = query.filter(*prefix_range(User.email, email))
+    if name:
+        # Every word of the search must start a word of the name: "smi" finds "John Smith".
+        # Tokens are case-folded in Python on both sides, so non-ASCII names match too.
+        words = name_tokens(name)
+        if not words:
+            query = query.filter(false())
+        for word in words:
+            query = query.filter(User.id.in_(
+                select(UserNameToken.user_id).where(*prefix_range(UserNameToken.token, word))
+            ))
+    if role:
+        query = query.filter(User.role == role)
+
+    # Count at most USERS_COUNT_LIMIT + 1 matches so deep tables don't cost a full count per page
+    limit = current_app.config["USERS_COUNT_LIMIT"]
+    matched = db.session.scalar(
+        select(func.count()).select_from(query.order_by(None).with_entities(User.id).limit(limit + 1).subquery())
+    )
+    rows = query.order_by(User.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+    return jsonify({
+        "users": [{"id": u.id, "name": u.name, "email": u.email, "role": u.role,
+                   "created_at": u.created_at.isoformat() if u.created_at else None} for u in rows],
+        "total": min(matched, limit),
+        "total_exact": matched <= limit,
+        "page": page,
+        "per_page": per_page,
+    }), 200
+
+
+def prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix, or None if there is none."""
+    prefix = prefix.rstrip(chr(sys.maxunicode))  # nothing sorts above U+10FFFF; carry into the previous character
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000  # surrogates cannot be encoded for the database
+    return prefix[:-1] + chr(code)
+
+
+def prefix_range(column, prefix):
+    """Conditions matching values of column that start with prefix."""
+    upper = prefix_upper_bound(prefix)
+    return (column >= prefix,) if upper is None else (column >= prefix, column < upper)
 
 
 @admin_bp.post("/users")
@@ -130,6 +204,7 @@ def user_detail(user_id):
 # -----------------------
 @admin_bp.post("/categories")
 @jwt_required()
+@idempotent
 def category_create():
     if not require_admin():
         return jsonify({"message": "forbidden"}), 403
@@ -145,6 +220,7 @@ def category_create():
             db.session.flush()
             created.append({"id": c.id, "name": c.name})
         db.session.commit()
+        bump_catalog_version()
         return jsonify({"message": "created", "categories": created}), 201
 
     data = data or {}
@@ -157,6 +233,7 @@ def category_create():
     c = Category(name=name)
     db.session.add(c)
     db.session.commit()
+    bump_catalog_version()
     return jsonify({"message": "created", "id": c.id, "name": c.name}), 201
 
 
@@ -183,6 +260,7 @@ def category_update(category_id):
 
     c.name = name
     db.session.commit()
+    bump_catalog_version()
     return jsonify({"message": "updated", "id": c.id, "name": c.name}), 200
 
 
@@ -198,6 +276,7 @@ def category_delete(category_id):
 
     db.session.delete(c)
     db.session.commit()
+    bump_catalog_version()
     return jsonify({"message": "deleted"}), 200
 
 
@@ -221,6 +300,7 @@ def product_list_admin():
 
 @admin_bp.post("/products")
 @jwt_required()
+@idempotent
 def product_create():
     if not require_admin():
         return jsonify({"message": "forbidden"}), 403
@@ -245,14 +325,41 @@ def product_create():
         return p, None
 
     if isinstance(payload, list):
-        created = []
+        # Bulk import: one category lookup, then a single bulk insert (COPY on PostgreSQL)
+        items = [(idx, item) for idx, item in enumerate(payload) if isinstance(item, dict)]
+        category_ids = set()
+        for _, item in items:
+            try:
+                category_ids.add(int(item.get("category_id")))
+            except (TypeError, ValueError):
+                pass
+        known = {cid for (cid,) in db.session.query(Category.id).filter(Category.id.in_(category_ids))}
+
+        rows = []
         errors = []
-        for idx, item in enumerate(payload):
-            if not isinstance(item, dict): continue
-            p, err = create_one(item)
-            if err: errors.append({"index": idx, **err})
-            else: created.append({"id": p.id, "name": p.name})
+        for idx, item in items:
+            category_id = item.get("category_id")
+            if isinstance(category_id, str) and category_id.isdigit():
+                category_id = int(category_id)
+            name = (item.get("name") or "").strip()
+            price = item.get("price")
+            if not category_id or not name or price is None:
+                errors.append({"index": idx, "message": "category_id, name, price required"})
+            elif category_id not in known:
+                errors.append({"index": idx, "message": f"category not found: {category_id}"})
+            else:
+                rows.append({
+                    "category_id": category_id,
+                    "name": name,
+                    "price": float(price),
+                    "stock": int(item.get("stock", 0) or 0),
+                    "description": item.get("description", ""),
+                })
+
+        ids = bulk_insert_products(rows)
+        created = [{"id": pid, "name": row["name"]} for pid, row in zip(ids, rows)]
         db.session.commit()
+        bump_catalog_version()
         return jsonify({"message": "created", "created": created, "errors": errors}), 201
 
     data = payload or {}
@@ -260,6 +367,7 @@ def product_create():
     if err: return jsonify(err), 400
 
     db.session.commit()
+    bump_catalog_version()
     return jsonify({"message": "created", "id": p.id}), 201
 
 
@@ -288,6 +396,7 @@ def product_update(product_id):
             return jsonify({"message": f"category not found: {cat_id}"}), 400
 
     db.session.commit()
+    bump_catalog_version()
     return jsonify({"message": "updated", "id": p.id}), 200
 
 
@@ -304,6 +413,7 @@ def product_delete(product_id):
 
     db.session.delete(p)
     db.session.commit()
+    bump_catalog_version()
     return jsonify({"message": "deleted"}), 200
 
 
@@ -316,14 +426,34 @@ def orders_list():
     if not require_admin():
         return jsonify({"message": "forbidden"}), 403
 
-    rows = Order.query.order_by(Order.id.desc()).all()
-    return jsonify([{
+    return json_list_response(select(Order).order_by(Order.id.desc()), lambda o: {
         "id": o.id,
         "user_id": o.user_id,
         "total": o.total,
         "status": o.status,
         "created_at": o.created_at.isoformat() if getattr(o, "created_at", None) else None
-    } for o in rows]), 200
+    })
+
+@admin_bp.get("/orders/export")
+@jwt_required()
+def orders_export():
+    if not require_admin():
+        return jsonify({"message": "forbidden"}), 403
+
+    fmt = request.args.get("format", "csv")
+    if fmt not in exports.FORMATS:
+        return jsonify({"message": "format must be csv or ndjson"}), 400
+    try:
+        filters = exports.parse_filters(request.args.get("status"), request.args.get("from"), request.args.get("to"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(exports.iter_export(fmt, **filters)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=orders.{fmt}"},
+    )
 
 @admin_bp.get("/orders/<int:order_id>")
 @jwt_required()
@@ -350,11 +480,87 @@ def order_update_status(order_id):
     if not status:
         return jsonify({"message": "status required"}), 400
 
+    record_status_change(o, o.status, status)
     o.status = status
     db.session.commit()
+    events.publish(o.user_id, "order_status", {"order_id": o.id, "status": o.status, "total": o.total})
     return jsonify({"message": "updated", "id": o.id, "status": o.status}), 200
 
 
+# -----------------------
+# Load shedding
+# -----------------------
+@admin_bp.get("/admission")
+@jwt_required()
+def admission_stats():
+    if not require_admin():
+        return jsonify({"message": "forbidden"}), 403
+    return jsonify({"pid": os.getpid(), "total": admission.total_stats(), "groups": admission.stats()}), 200
+
+
+# -----------------------
+# Profiling
+# -----------------------
+@admin_bp.get("/profile")
+@jwt_required()
+def profile_summary():
+    if not require_admin():
+        return jsonify({"message": "forbidden"}), 403
+    prof = profiling.profiler()
+
+    top = request.args.get("top", default=20, type=int)
+    return jsonify({
+        "pid": os.getpid(),
+        "interval": prof.interval,
+        "settings": prof.settings.as_dict(),
+        "endpoints": prof.summary(top),
+    }), 200
+
+@admin_bp.put("/profile/settings")
+@jwt_required()
+def profile_settings():
+    if not require_admin():
+        return jsonify({"message": "forbidden"}), 403
+    settings = profiling.profiler().settings
+    data = request.get_json(silent=True) or {}
+
+    enabled = data.get("enabled", settings.enabled)
+    if not isinstance(enabled, bool):
+        return jsonify({"message": "enabled must be true or false"}), 400
+    try:
+        rate = float(data.get("sample_rate", settings.rate))
+    except (TypeError, ValueError):
+        return jsonify({"message": "sample_rate must be a number"}), 400
+    if not 0.0 <= rate <= 1.0:
+        return jsonify({"message": "sample_rate must be between 0 and 1"}), 400
+
+    settings.update(enabled, rate)
+    return jsonify({"message": "updated", **settings.as_dict()}), 200
+
+@admin_bp.get("/profile/collapsed")
+@jwt_required()
+def profile_collapsed():
+    if not require_admin():
+        return jsonify({"message": "forbidden"}), 403
+    prof = profiling.profiler()
+
+    return Response(
+        prof.collapsed(request.args.get("endpoint")),
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename=profile-{os.getpid()}.collapsed"},
+    )
+
+@admin_bp.delete("/profile")
+@jwt_required()
+def profile_reset():
+    if not require_admin():
+        return jsonify({"message": "forbidden"}), 403
+    prof = profiling.profiler()
+
+    prof.reset()
+    return jsonify({"message": "reset", "pid": os.getpid()}), 200
+
+
 # -----------------------
 # Report
 # -----------------------
@@ -364,6 +570,65 @@ def report_sale():
     if not require_admin():
         return jsonify({"message": "forbidden"}), 403
 
-    rows = Order.query.filter(Order.status.in_(["paid", "delivered"])).all()
+    rows = Order.query.filter(Order.status.in_(COUNTED_STATUSES)).all()
     total = sum(o.total for o in rows)
     return jsonify({"orders_count": len(rows), "total_sales": total}), 200
+
+
+@admin_bp.get("/report/top-products")
+@jwt_required()
+def report_top_products():
+    if not require_admin():
+        return jsonify({"message": "forbidden"}), 403
+
+    by = request.args.get("by", "qty")
+    if by not in ("qty", "revenue"):
+        return jsonify({"message": "by must be qty or revenue"}), 400
+    try:
+        limit = min(100, max(1, int(request.args.get("limit", 10))))
+    except (TypeError, ValueError):
+        return jsonify({"message": "limit must be a number"}), 400
+
+    column = ProductSales.qty if by == "qty" else ProductSales.revenue
+    rows = (
+        db.session.query(ProductSales, Product.name, Product.category_id)
+        .join(Product, Product.id == ProductSales.product_id)
+        .filter(column > 0)
+        .order_by(column.desc())
+        .limit(limit)
+        .all()
+    )
+    return jsonify([{
+        "product_id": s.product_id,
+        "name": name,
+        "category_id": category_id,
+        "qty": s.qty,
+        "revenue": s.revenue,
+    } for s, name, category_id in rows]), 200
+
+
+@admin_bp.get("/report/category-revenue")
+@jwt_required()
+def report_category_revenue():
+    if not require_admin():
+        return jsonify({"message": "forbidden"}), 403
+
+    rows = (
+        db.session.query(
+            Category.id,
+            Category.name,
+            func.coalesce(func.sum(ProductSales.qty), 0),
+            func.coalesce(func.sum(ProductSales.revenue), 0),
+        )
+        .join(Product, Product.category_id == Category.id)
+        .join(ProductSales, ProductSales.product_id == Product.id)
+        .group_by(Category.id, Category.name)
+        .order_by(func.sum(ProductSales.revenue).desc())
+        .all()
+    )
+    return jsonify([{
+        "category_id": cid,
+        "name": name,
+        "qty": qty,
+        "revenue": revenue,
+    } for cid, name, qty, revenue in rows]), 200
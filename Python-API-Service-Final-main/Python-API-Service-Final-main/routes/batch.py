@@ -0,0 +1,82 @@
+from flask import Blueprint, request, jsonify, current_app, g
+
+from extensions import db, transactional_session
+
+batch_bp = Blueprint("batch", __name__)
+
+ALLOWED_PREFIXES = ("/api/front/", "/api/admin/")
+
+
+def dispatch(sub, atomic=False):
+    """Run one sub-request in-process, reusing the current app context and DB session."""
+    method = (sub.get("method") or "GET").upper()
+    path = sub.get("path") or ""
+    headers = dict(sub.get("headers") or {})
+    if "Authorization" not in headers and request.headers.get("Authorization"):
+        headers["Authorization"] = request.headers["Authorization"]
+
+    with current_app.test_request_context(
+        path,
+        method=method,
+        headers=headers,
+        json=sub.get("body"),
+        environ_base={"REMOTE_ADDR": request.remote_addr},
+    ):
+        try:
+            resp = current_app.full_dispatch_request()
+        except Exception:
+            current_app.logger.exception("batch sub-request failed: %s %s", method, path)
+            if not atomic:
+                db.session.rollback()  # don't leave the shared session failed for later sub-requests
+            return {"status": 500, "body": {"message": "internal error"}}
+
+    if resp.is_streamed:
+        # Reading it would hold the batch (and an atomic transaction) open until the stream ends
+        resp.close()
+        return {"status": 400, "body": {"message": "streaming endpoints cannot be batched"}}
+
+    body = resp.get_json(silent=True)
+    if body is None and resp.status_code != 304:
+        body = resp.get_data(as_text=True)
+    return {"status": resp.status_code, "body": body}
+
+
+@batch_bp.post("/batch")
+def batch():
+    data = request.get_json(silent=True) or {}
+    subs = data.get("requests")
+    atomic = bool(data.get("atomic"))
+
+    if not isinstance(subs, list) or not subs:
+        return jsonify({"message": "requests must be a non-empty list"}), 400
+    limit = current_app.config["BATCH_MAX_REQUESTS"]
+    if len(subs) > limit:
+        return jsonify({"message": f"at most {limit} requests per batch"}), 400
+    for sub in subs:
+        if not isinstance(sub, dict) or not str(sub.get("path") or "").startswith(ALLOWED_PREFIXES):
+            return jsonify({"message": "each request needs a path under /api/front/ or /api/admin/"}), 400
+
+    if not atomic:
+        return jsonify({"responses": [dispatch(sub) for sub in subs]}), 200
+
+    db.session.remove()
+    session, finish = transactional_session()
+    db.session.registry.set(session)
+    g.after_commit = []
+    responses = []
+    try:
+        for sub in subs:
+            responses.append(dispatch(sub, atomic=True))
+            if responses[-1]["status"] >= 400:
+                break
+    finally:
+        ok = len(responses) == len(subs) and all(r["status"] < 400 for r in responses)
+        db.session.registry.clear()
+        finish(commit=ok)
+        deferred = g.pop("after_commit")
+
+    if ok:
+        for fn, args, kwargs in deferred:
+            fn(*args, **kwargs)
+
+    return jsonify({"responses": responses, "committed": ok}), 200
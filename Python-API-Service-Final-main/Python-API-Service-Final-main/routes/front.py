@@ -1,7 +1,17 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+import math
+
+from flask import Blueprint, current_app, request, jsonify, Response
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 
 from extensions import db
+from catalog import catalog_cached, bump_catalog_version
+from snapshot import PRODUCT_SORTS, get_snapshot
+from ratelimit import rate_limited
+import revocation
+from dialects import lock_cart_items, lock_products, upsert_cart_item
+import events
+from carts import touch_cart
+from idempotency import idempotent
 from models import User, Category, Product, CartItem, Order, OrderDetail
 
 front_bp = Blueprint("front", __name__)
@@ -9,22 +19,78 @@ front_bp = Blueprint("front", __name__)
 
 # ---------- PUBLIC READ ----------
 @front_bp.get("/category-list")
+@catalog_cached
 def category_list():
     """Get all categories"""
     rows = Category.query.order_by(Category.id.desc()).all()
     return jsonify([{"id": c.id, "name": c.name} for c in rows]), 200
 
 
+def product_filters():
+    """min_price, max_price, in_stock and sort from the query string; raises ValueError."""
+    args = request.args
+    filters = {
+        "min_price": None,
+        "max_price": None,
+        "in_stock": args.get("in_stock", "").lower() in ("1", "true"),
+        "sort": args.get("sort") or "newest",
+    }
+    for name in ("min_price", "max_price"):
+        if args.get(name):
+            value = float(args[name])
+            if not math.isfinite(value):
+                raise ValueError(name)
+            filters[name] = value
+    if filters["sort"] not in PRODUCT_SORTS:
+        raise ValueError("sort")
+    return filters
+
+
+def filter_products(query, min_price=None, max_price=None, in_stock=False, sort="newest"):
+    """Database equivalent of Snapshot.select."""
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if in_stock:
+        query = query.filter(Product.stock > 0)
+    if sort == "price":
+        return query.order_by(Product.price, Product.id.desc())
+    if sort == "-price":
+        return query.order_by(Product.price.desc(), Product.id.desc())
+    return query.order_by(Product.id.desc())
+
+
+def invalid_filters():
+    return jsonify({
+        "message": "min_price and max_price must be numbers; sort must be one of " + ", ".join(PRODUCT_SORTS),
+    }), 400
+
+
 @front_bp.get("/category-list/<int:category_id>")
+@catalog_cached
 def category_products(category_id):
-    """Get all products for a specific category"""
+    """Get all products for a specific category (optionally filtered and sorted)"""
+    try:
+        filters = product_filters()
+    except ValueError:
+        return invalid_filters()
+
+    snap = get_snapshot()
+    if snap is not None:
+        ok, body = snap.consistent(snap.category_products_json, category_id, **filters)
+        if ok:
+            if body is None:
+                return jsonify({"message": "category not found"}), 404
+            return current_app.response_class(body, mimetype="application/json")
+
     # Check if category exists
     category = Category.query.get(category_id)
     if not category:
         return jsonify({"message": "category not found"}), 404
 
     # Get products for this category
-    products = Product.query.filter_by(category_id=category_id).order_by(Product.id.desc()).all()
+    products = filter_products(Product.query.filter_by(category_id=category_id), **filters).all()
 
     return jsonify({
         "category": {"id": category.id, "name": category.name},
@@ -42,9 +108,21 @@ def category_products(category_id):
 
 
 @front_bp.get("/product-list")
+@catalog_cached
 def product_list():
-    """Get all products"""
-    rows = Product.query.order_by(Product.id.desc()).all()
+    """Get all products (optionally filtered and sorted)"""
+    try:
+        filters = product_filters()
+    except ValueError:
+        return invalid_filters()
+
+    snap = get_snapshot()
+    if snap is not None:
+        ok, body = snap.consistent(snap.products_json, **filters)
+        if ok:
+            return current_app.response_class(body, mimetype="application/json")
+
+    rows = filter_products(Product.query, **filters).all()
     return jsonify([
         {
             "id": p.id,
@@ -59,6 +137,7 @@ def product_list():
 
 # ---------- AUTH ----------
 @front_bp.post("/register")
+@rate_limited
 def register():
     data = request.get_json(silent=True) or {}
     name = (data.get("name") or "").strip()
@@ -80,6 +159,7 @@ def register():
 
 
 @front_bp.post("/login")
+@rate_limited
 def login():
     data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
@@ -105,6 +185,7 @@ def login():
 
 
 @front_bp.post("/reset-password")
+@rate_limited
 def reset_password():
     data = request.get_json(silent=True) or {}
     email = (data.get("email") or "").strip().lower()
@@ -123,9 +204,10 @@ def reset_password():
 
 
 @front_bp.post("/logout")
+@jwt_required()
 def logout():
-    # Simple version: client deletes token.
-    # If you want true logout, use a token blocklist/revoking approach. [web:161]
+    token = get_jwt()
+    revocation.store.revoke(token["jti"], token.get("exp"))
     return jsonify({"message": "logout successfully"}), 200
 
 
@@ -140,6 +222,7 @@ def me():
 # ---------- CART ----------
 @front_bp.post("/add-to-cart")
 @jwt_required()
+@idempotent
 def add_to_cart():
     # 1. Safely get user_id (cast string back to int)
     current_identity = get_jwt_identity()
@@ -170,13 +253,9 @@ def add_to_cart():
     if not p:
         return jsonify({"message": "product not found"}), 404
 
-    # 4. Add to cart logic
-    item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
-    if item:
-        item.qty += qty
-    else:
-        item = CartItem(user_id=user_id, product_id=product_id, qty=qty)
-        db.session.add(item)
+    # 4. Add to cart logic (single upsert where the backend supports it)
+    upsert_cart_item(user_id, product_id, qty)
+    touch_cart(user_id)
 
     db.session.commit()
     return jsonify({"message": "added to cart"}), 200
@@ -193,6 +272,7 @@ def delete_cart_item(product_id):
         return jsonify({"message": "item not found"}), 404
 
     db.session.delete(item)
+    touch_cart(user_id)
     db.session.commit()
     return jsonify({"message": "item deleted"}), 200
 
@@ -200,6 +280,7 @@ def delete_cart_item(product_id):
 # ---------- CHECKOUT / ORDERS ----------
 @front_bp.post("/checkout")
 @jwt_required()
+@idempotent
 def checkout():
     # FIX: Cast identity back to int
     try:
@@ -207,16 +288,17 @@ def checkout():
     except (ValueError, TypeError):
         return jsonify({"message": "Invalid user identity"}), 401
 
-    items = CartItem.query.filter_by(user_id=user_id).all()
+    items = lock_cart_items(user_id)
     if not items:
         return jsonify({"message": "cart empty"}), 400
 
 
     total = 0.0
+    products = lock_products([it.product_id for it in items])
 
     # Validate stock + compute total
     for it in items:
-        product = Product.query.get(it.product_id)
+        product = products.get(it.product_id)
         if not product:
             return jsonify({"message": f"product not found: {it.product_id}"}), 404
 
@@ -230,8 +312,9 @@ def checkout():
     db.session.flush()  # order.id available without committing
 
     # Create details + reduce stock + clear cart
+    product_ids = [it.product_id for it in items]
     for it in items:
-        product = Product.query.get(it.product_id)
+        product = products[it.product_id]
 
         db.session.add(OrderDetail(
             order_id=order.id,
@@ -240,10 +323,17 @@ def checkout():
             price=product.price,
         ))
 
-        product.stock -= it.qty
+        product.stock -= it.qty  # sales are counted once the order is paid (analytics)
         db.session.delete(it)
 
     db.session.commit()
+    bump_catalog_version(stock_changed=product_ids)
+    events.publish(user_id, "order_created", {
+        "order_id": order.id,
+        "status": order.status,
+        "total": order.total,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+    })
     return jsonify({"message": "checkout ok", "order_id": order.id, "total": total}), 200
 
 
@@ -262,3 +352,24 @@ def tracking_order():
         }
         for o in orders
     ]), 200
+
+
+@front_bp.get("/order-events")
+@jwt_required()
+def order_events():
+    """Server-Sent Events stream of the user's order changes (replaces polling tracking-order)"""
+    try:
+        user_id = int(get_jwt_identity())
+    except (ValueError, TypeError):
+        return jsonify({"message": "Invalid user identity"}), 401
+
+    resume = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_event_id = int(resume) if resume else None
+    except ValueError:
+        last_event_id = None
+
+    return Response(events.stream(user_id, last_event_id), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
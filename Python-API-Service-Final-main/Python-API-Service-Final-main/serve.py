@@ -0,0 +1,129 @@
+"""Production entry point: pre-forking multi-process server (gunicorn).
+
+    python serve.py
+
+Settings come from Config (SERVE_* env vars). The app is loaded once in the
+master before fork; each worker then resets its DB pool and warms up.
+
+Signals to the master process:
+    HUP   graceful restart of all workers
+    TTIN  / TTOU  add / remove one worker
+    USR2  + TERM on the old master: zero-downtime code upgrade
+"""
+import logging
+import os
+import threading
+import time
+
+from gunicorn.app.base import BaseApplication
+from sqlalchemy import text
+
+from app import app
+from carts import start_background_sweeper
+from config import Config
+from extensions import db
+
+log = logging.getLogger("gunicorn.error")
+
+# Per-worker counters (each forked worker gets its own copy)
+stats = {"pid": None, "started": 0.0, "requests": 0, "errors": 0, "busy_seconds": 0.0}
+stats_lock = threading.Lock()
+
+
+def warmup(flask_app):
+    """Open pooled DB connections and hit the catalog endpoints once."""
+    with flask_app.app_context():
+        pool = db.engine.pool
+        size = pool.size() if hasattr(pool, "size") else 1
+        conns = [db.engine.connect() for _ in range(max(1, min(size, Config.SERVE_THREADS)))]
+        for conn in conns:
+            conn.execute(text("SELECT 1"))
+        for conn in conns:
+            conn.close()
+
+    client = flask_app.test_client()
+    for path in ("/api/front/category-list", "/api/front/product-list"):
+        client.get(path)
+
+
+def report(reason):
+    uptime = time.time() - stats["started"]
+    log.info(
+        "worker %s %s: requests=%d errors=%d busy=%.2fs uptime=%.0fs",
+        stats["pid"], reason, stats["requests"], stats["errors"], stats["busy_seconds"], uptime,
+    )
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with children
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    stats.update(pid=worker.pid, started=time.time(), requests=0, errors=0, busy_seconds=0.0)
+    try:
+        warmup(app)
+    except Exception:
+        log.exception("worker %s warmup failed", worker.pid)
+    start_background_sweeper(app)  # only the worker holding its lock sweeps
+    report("ready")
+
+
+def pre_request(worker, req):
+    req._serve_started = time.monotonic()
+
+
+def post_request(worker, req, environ, resp):
+    with stats_lock:
+        stats["requests"] += 1
+        stats["busy_seconds"] += time.monotonic() - getattr(req, "_serve_started", time.monotonic())
+        if resp is not None and str(resp.status).startswith("5"):
+            stats["errors"] += 1
+        due = Config.SERVE_STATS_INTERVAL and stats["requests"] % Config.SERVE_STATS_INTERVAL == 0
+    if due:
+        report("stats")
+
+
+def worker_exit(server, worker):
+    report("exit")
+
+
+class Server(BaseApplication):
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def options():
+    return {
+        "bind": Config.SERVE_BIND,
+        "workers": Config.SERVE_WORKERS,
+        "threads": Config.SERVE_THREADS,
+        "worker_class": "gthread" if Config.SERVE_THREADS > 1 else "sync",
+        "timeout": Config.SERVE_TIMEOUT,
+        "graceful_timeout": Config.SERVE_GRACEFUL_TIMEOUT,
+        "max_requests": Config.SERVE_MAX_REQUESTS,
+        "max_requests_jitter": Config.SERVE_MAX_REQUESTS_JITTER,
+        "preload_app": True,
+        "accesslog": os.getenv("SERVE_ACCESS_LOG"),
+        "post_fork": post_fork,
+        "pre_request": pre_request,
+        "post_request": post_request,
+        "worker_exit": worker_exit,
+    }
+
+
+def main():
+    Server(app, options()).run()
+
+
+if __name__ == "__main__":
+    main()
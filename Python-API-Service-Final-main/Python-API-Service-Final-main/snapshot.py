@@ -0,0 +1,388 @@
+"""Read-only catalog snapshot shared by all workers through mmap.
+
+Layout (little endian, every section 8-byte aligned):
+
+    header      magic, catalog version, product count, category count,
+                product JSON length, category names length
+    products    JSON records, newest first, each followed by ","; record
+                offsets uint32[n + 1]
+    columns     per record: id int64[n], category id int64[n], price float64[n],
+                stock int64[n]
+    id index    product ids ascending int64[n] and their record numbers uint32[n]
+    categories  ids ascending int64[m], name offsets uint32[m + 1], names utf-8,
+                start of each category in the by-category list uint32[m + 1]
+    by category record numbers grouped by category id, newest first uint32[n]
+
+Responses are sliced straight out of the mapping: the product list is one
+contiguous slice and lookups by product or category id are bisections over the
+sorted arrays, so a worker keeps no per-product Python objects. Price and stock
+filters and price sorting read the typed columns and then join the matching
+records, so no record is parsed.
+
+Admin product/category changes rebuild the file (written aside, then renamed).
+Checkout only patches stock in place: the stock value in each record is padded
+to a fixed width, and the stock column is rewritten next to it. If the snapshot
+cannot be patched, or another writer holds the lock, checkout leaves it stale.
+Readers then fall back to the database until a reader rebuilds it. While a patch
+is written, the header version is PATCHING. A read that overlapped a patch sees
+the version change and is discarded (Snapshot.consistent). A snapshot is used
+only while its header version equals the current catalog version; otherwise
+callers fall back to the database.
+"""
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import current_app
+
+from catalog import catalog_version
+from extensions import db
+from models import Category, Product
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MAGIC = b"CATSNAP3"
+HEADER = struct.Struct("<8sQQQQQ")
+VERSION_OFFSET = 8
+PATCHING = 2 ** 64 - 1  # header version while checkout rewrites stock in place
+PRODUCT_SORTS = ("newest", "price", "-price")
+STOCK_WIDTH = 20  # digits + padding; fits any int64
+STOCK_TAIL = STOCK_WIDTH + 2  # stock text, "}" and the "," separator end every record
+
+_open = {"path": None, "inode": None, "snapshot": None}
+
+
+def filtered(min_price=None, max_price=None, in_stock=False, sort="newest"):
+    """Whether the product filters change the plain newest-first list."""
+    return min_price is not None or max_price is not None or bool(in_stock) or sort != "newest"
+
+
+def align(n):
+    return (n + 7) & ~7
+
+
+def snapshot_path():
+    path = current_app.config.get("CATALOG_SNAPSHOT_FILE")
+    if not path:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        path = os.path.join(current_app.instance_path, "catalog.snapshot")
+    return path
+
+
+def pack_strings(values):
+    offsets, blob = [0], bytearray()
+    for value in values:
+        blob += value.encode()
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def stock_text(stock):
+    return f"{stock or 0:<{STOCK_WIDTH}d}"
+
+
+def product_record(row):
+    """JSON object with the same keys as the database path; stock last, padded with spaces."""
+    head = json.dumps(
+        {"category_id": row.category_id, "id": row.id, "name": row.name, "price": row.price},
+        separators=(",", ":"), sort_keys=True,
+    )
+    return f'{head[:-1]},"stock":{stock_text(row.stock)}}},'
+
+
+def layout(n, m, json_len, cat_names_len):
+    """Byte offsets of every section."""
+    pos = HEADER.size
+    sections = {}
+    for name, size in (
+        ("json", json_len), ("json_offsets", 4 * (n + 1)),
+        ("ids", 8 * n), ("category_ids", 8 * n), ("prices", 8 * n), ("stocks", 8 * n),
+        ("sorted_ids", 8 * n), ("sorted_records", 4 * n),
+        ("cat_ids", 8 * m), ("cat_name_offsets", 4 * (m + 1)), ("cat_names", cat_names_len),
+        ("cat_starts", 4 * (m + 1)), ("by_category", 4 * n),
+    ):
+        sections[name] = (pos, size)
+        pos = align(pos + size)
+    return sections, pos
+
+
+class Snapshot:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, n, m, json_len, cat_names_len = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError("not a catalog snapshot")
+
+        sections, total = layout(n, m, json_len, cat_names_len)
+        if total > len(self.mm):
+            raise ValueError("truncated catalog snapshot")
+        view = memoryview(self.mm)
+
+        def section(name, fmt=None):
+            start, size = sections[name]
+            part = view[start:start + size]
+            return part.cast(fmt) if fmt else part
+
+        self.json = section("json")
+        self.json_start = sections["json"][0]
+        self.json_offsets = section("json_offsets", "I")
+        self.ids = section("ids", "q")
+        self.category_ids = section("category_ids", "q")
+        self.prices = section("prices", "d")
+        self.stocks = section("stocks", "q")
+        self.stocks_start = sections["stocks"][0]
+        self.sorted_ids = section("sorted_ids", "q")
+        self.sorted_records = section("sorted_records", "I")
+        self.cat_ids = section("cat_ids", "q")
+        self.cat_name_offsets = section("cat_name_offsets", "I")
+        self.cat_names = section("cat_names")
+        self.cat_starts = section("cat_starts", "I")
+        self.by_category = section("by_category", "I")
+
+    @property
+    def version(self):
+        return struct.unpack_from("<Q", self.mm, VERSION_OFFSET)[0]
+
+    def record_number(self, product_id):
+        """Position of the product's JSON record, or None."""
+        i = bisect_left(self.sorted_ids, product_id)
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == product_id:
+            return self.sorted_records[i]
+        return None
+
+    def category_index(self, category_id):
+        i = bisect_left(self.cat_ids, category_id)
+        if i < len(self.cat_ids) and self.cat_ids[i] == category_id:
+            return i
+        return None
+
+    def category_name(self, category_id):
+        """Name of the category, or None if it does not exist."""
+        i = self.category_index(category_id)
+        if i is None:
+            return None
+        return bytes(self.cat_names[self.cat_name_offsets[i]:self.cat_name_offsets[i + 1]]).decode()
+
+    def record(self, r):
+        return self.json[self.json_offsets[r]:self.json_offsets[r + 1] - 1]
+
+    def select(self, records, min_price=None, max_price=None, in_stock=False, sort="newest"):
+        """Record numbers passing the filters, in `sort` order (see PRODUCT_SORTS)."""
+        prices, stocks = self.prices, self.stocks
+        if min_price is not None:
+            records = [r for r in records if prices[r] >= min_price]
+        if max_price is not None:
+            records = [r for r in records if prices[r] <= max_price]
+        if in_stock:
+            records = [r for r in records if stocks[r] > 0]
+        if sort == "price":
+            records = sorted(records, key=prices.__getitem__)  # stable: newest first among equal prices
+        elif sort == "-price":
+            records = sorted(records, key=lambda r: -prices[r])
+        return records
+
+    def products_json(self, category_id=None, **filters):
+        """JSON array of products, newest first unless sorted, optionally for one category and filtered."""
+        if category_id is None:
+            if not filtered(**filters):
+                return b"[" + self.json[:-1].tobytes() + b"]" if len(self.json) else b"[]"
+            records = range(len(self.ids))
+        else:
+            i = self.category_index(category_id)
+            if i is None:
+                return b"[]"
+            records = self.by_category[self.cat_starts[i]:self.cat_starts[i + 1]]
+        return b"[" + b",".join(self.record(r) for r in self.select(records, **filters)) + b"]"
+
+    def category_products_json(self, category_id, **filters):
+        """{"category": ..., "products": [...]} for one category, or None if it does not exist."""
+        name = self.category_name(category_id)
+        if name is None:
+            return None
+        category = json.dumps({"id": category_id, "name": name}, separators=(",", ":"), sort_keys=True)
+        products = self.products_json(category_id, **filters)
+        return b'{"category":' + category.encode() + b',"products":' + products + b"}"
+
+    def consistent(self, read, *args, **kwargs):
+        """(True, read(...)), or (False, None) if a stock patch started or finished during the read."""
+        before = self.version
+        result = read(*args, **kwargs)
+        if before == PATCHING or self.version != before:
+            return False, None
+        return True, result
+
+    def stock_position(self, r):
+        """File offset of record r's padded stock text."""
+        return self.json_start + self.json_offsets[r + 1] - STOCK_TAIL
+
+    def stock_column_position(self, r):
+        return self.stocks_start + 8 * r
+
+
+def build_snapshot():
+    """Write a fresh snapshot from the database and atomically replace the old one."""
+    path = snapshot_path()
+    version, _ = catalog_version()  # read before the data so the file is never newer than its label
+
+    rows = db.session.query(
+        Product.id, Product.category_id, Product.price, Product.stock, Product.name
+    ).order_by(Product.id.desc()).all()
+    cats = db.session.query(Category.id, Category.name).order_by(Category.id).all()
+
+    json_offsets, blob = pack_strings(product_record(r) for r in rows)
+    cat_name_offsets, cat_names = pack_strings(c.name for c in cats)
+    n, m = len(rows), len(cats)
+
+    sorted_records = sorted(range(n), key=lambda r: rows[r].id)
+    # Records are newest first, so a stable sort by category keeps id desc within each category
+    by_category = sorted(range(n), key=lambda r: rows[r].category_id)
+    cat_starts, r = [], 0
+    for c in cats:
+        while r < n and rows[by_category[r]].category_id < c.id:
+            r += 1
+        cat_starts.append(r)
+    cat_starts.append(n)  # each category ends where the next one starts
+
+    sections, total = layout(n, m, len(blob), len(cat_names))
+    buf = bytearray(total)
+    HEADER.pack_into(buf, 0, MAGIC, version, n, m, len(blob), len(cat_names))
+    for name, fmt, values in (
+        ("json_offsets", "I", json_offsets),
+        ("ids", "q", [r.id for r in rows]),
+        ("category_ids", "q", [r.category_id for r in rows]),
+        ("prices", "d", [r.price or 0.0 for r in rows]),
+        ("stocks", "q", [r.stock or 0 for r in rows]),
+        ("sorted_ids", "q", [rows[r].id for r in sorted_records]),
+        ("sorted_records", "I", sorted_records),
+        ("cat_ids", "q", [c.id for c in cats]),
+        ("cat_name_offsets", "I", cat_name_offsets),
+        ("cat_starts", "I", cat_starts),
+        ("by_category", "I", by_category),
+    ):
+        struct.pack_into(f"<{len(values)}{fmt}", buf, sections[name][0], *values)
+    buf[sections["json"][0]:sections["json"][0] + len(blob)] = blob
+    buf[sections["cat_names"][0]:sections["cat_names"][0] + len(cat_names)] = cat_names
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(buf)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def writer_lock(blocking=True):
+    """Serialize snapshot writers across processes; yields False if busy and not blocking."""
+    if not fcntl:
+        yield True
+        return
+    with open(snapshot_path() + ".lock", "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+
+def patch_stock(snap, version, product_ids):
+    """Rewrite the stock of product_ids in place and label the file `version`.
+
+    The header says PATCHING until every value is written, so readers fall back
+    meanwhile and a read that overlapped the patch is discarded.
+    """
+    stock = dict(db.session.query(Product.id, Product.stock).filter(Product.id.in_(product_ids)).all())
+    fd = os.open(snapshot_path(), os.O_WRONLY)
+    try:
+        os.pwrite(fd, struct.pack("<Q", PATCHING), VERSION_OFFSET)
+        for pid, value in stock.items():
+            r = snap.record_number(pid)
+            os.pwrite(fd, stock_text(value).encode(), snap.stock_position(r))
+            os.pwrite(fd, struct.pack("<q", value or 0), snap.stock_column_position(r))
+        os.pwrite(fd, struct.pack("<Q", version), VERSION_OFFSET)
+    finally:
+        os.close(fd)
+
+
+def refresh_snapshot(version, stock_changed=None):
+    """Bring the snapshot up to `version` after a catalog write; never fails the caller.
+
+    Admin changes rebuild the file. A stock-only change (checkout) never
+    rebuilds or waits: it is patched in place when it sits directly on top of
+    the snapshot's version and the lock is free. Otherwise it is skipped, and
+    readers use the database until one of them rebuilds the snapshot.
+    """
+    if not current_app.config.get("CATALOG_SNAPSHOT_ENABLED"):
+        return
+    try:
+        if not stock_changed:
+            with writer_lock():
+                snap = load_snapshot()
+                if snap is None or snap.version == PATCHING or snap.version < version:
+                    build_snapshot()
+            return
+        with writer_lock(blocking=False) as acquired:
+            if not acquired:
+                return
+            snap = load_snapshot()
+            if (
+                snap is not None
+                and snap.version == version - 1
+                and all(snap.record_number(pid) is not None for pid in stock_changed)
+            ):
+                patch_stock(snap, version, stock_changed)
+    except Exception:
+        current_app.logger.exception("catalog snapshot refresh failed")
+
+
+def load_snapshot():
+    """This worker's mapping of the snapshot file, reopened if the file was replaced."""
+    path = snapshot_path()
+    try:
+        inode = os.stat(path).st_ino
+    except FileNotFoundError:
+        inode = None
+
+    if _open["path"] != path or _open["inode"] != inode:
+        snap = None
+        if inode:
+            try:
+                snap = Snapshot(path)
+            except (OSError, ValueError, struct.error):
+                # Unreadable or from an older layout: treated as missing, so it gets rebuilt
+                current_app.logger.warning("ignoring unreadable catalog snapshot %s", path, exc_info=True)
+        _open.update(path=path, inode=inode, snapshot=snap)
+    return _open["snapshot"]
+
+
+def get_snapshot():
+    """Return the snapshot if it matches the current catalog version, else None.
+
+    A missing, stale or unreadable snapshot is rebuilt by whichever worker gets
+    the writer lock first; the others answer from the database meanwhile, as
+    does everyone if the rebuild fails.
+    """
+    if not current_app.config.get("CATALOG_SNAPSHOT_ENABLED"):
+        return None
+
+    try:
+        version, _ = catalog_version()
+        snap = load_snapshot()
+        if snap is None or snap.version != version:  # includes PATCHING
+            with writer_lock(blocking=False) as acquired:
+                if not acquired:
+                    return None
+                snap = load_snapshot()
+                if snap is None or snap.version != version:
+                    build_snapshot()
+                    snap = load_snapshot()
+    except Exception:
+        current_app.logger.exception("catalog snapshot unavailable; using the database")
+        return None
+    return snap if snap is not None and snap.version == version else None
@@ -0,0 +1,104 @@
+"""Shared fixtures: one app bound to a throwaway SQLite file seeded with synthetic data."""
+import atexit
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP = tempfile.mkdtemp(prefix="ecommerce-tests-")
+atexit.register(shutil.rmtree, TMP, ignore_errors=True)
+
+# Config is read at import time, so point every store at TMP before the app is imported
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(TMP, 'test.db')}",
+    "CATALOG_VERSION_FILE": os.path.join(TMP, "catalog.version"),
+    "CATALOG_SNAPSHOT_ENABLED": "0",
+    "RATELIMIT_ENABLED": "0",
+    "ADMISSION_ENABLED": "0",
+    "EVENTS_STORAGE": os.path.join(TMP, "events.sqlite"),
+    "PROFILE_SETTINGS_FILE": os.path.join(TMP, "profiling.settings"),
+})
+sys.path.insert(0, ROOT)
+
+SEED_ROWS = 2000
+
+
+def seed(engine, rows):
+    """Bulk-insert `rows` rows into each large table, then ANALYZE."""
+    from sqlalchemy import insert, text
+    from models import (User, UserNameToken, Category, Product, CartItem, Order, OrderDetail, ProductSales,
+                        RevokedToken, IdempotencyKey, name_tokens)
+
+    rnd = random.Random(0)
+    start = datetime(2025, 1, 1)
+    n_cat = max(10, rows // 100)
+    statuses = ["pending", "paid", "shipped", "delivered", "cancelled"]
+
+    def when(i):
+        return start + timedelta(minutes=i)
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "name": f"User {i}", "email": f"user{i}@example.com", "password_hash": "x",
+             "role": "admin" if i % 1000 == 0 else "customer", "created_at": when(i)}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(insert(UserNameToken), [
+            {"user_id": i, "token": token} for i in range(1, rows + 1) for token in name_tokens(f"User {i}")
+        ])
+        conn.execute(insert(Category), [
+            {"id": i, "name": f"category-{i}", "created_at": when(i)} for i in range(1, n_cat + 1)
+        ])
+        conn.execute(insert(Product), [
+            {"id": i, "category_id": rnd.randint(1, n_cat), "name": f"product-{i}",
+             "price": rnd.uniform(1, 100), "stock": rnd.randint(0, 50)}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(insert(CartItem), [
+            # (user_id, product_id) is unique; spread lines over users and products without repeats
+            {"user_id": i, "product_id": (i * 7919) % rows + 1, "qty": 1, "updated_at": when(i)}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(insert(Order), [
+            {"id": i, "user_id": rnd.randint(1, rows), "total": 10.0,
+             "status": statuses[0] if i % 50 else rnd.choice(statuses), "created_at": when(i)}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(insert(OrderDetail), [
+            {"order_id": rnd.randint(1, rows), "product_id": rnd.randint(1, rows), "qty": 1, "price": 10.0}
+            for _ in range(rows * 3)
+        ])
+        conn.execute(insert(ProductSales), [
+            {"product_id": i, "qty": rnd.randint(0, 500), "revenue": rnd.uniform(0, 5000)}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(insert(RevokedToken), [
+            {"jti": f"jti-{i}", "expires_at": when(i)} for i in range(1, rows + 1)
+        ])
+        conn.execute(insert(IdempotencyKey), [
+            {"scope": f"{i}:front.checkout", "key": f"key-{i}", "request_hash": "x",
+             "created_at": when(i), "expires_at": when(i + 1440)}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(text("ANALYZE"))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app
+    from extensions import db
+
+    with flask_app.app_context():
+        db.create_all()
+        seed(db.engine, SEED_ROWS)
+    yield flask_app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    return app.test_client()
@@ -0,0 +1,55 @@
+"""Admin user search: word-prefix name matching, Unicode case folding, odd prefixes."""
+import pytest
+
+ADMIN = {"name": "Search Admin", "email": "search-admin@example.com", "password": "search-pw"}
+
+
+@pytest.fixture(scope="module")
+def headers(app, client):
+    from extensions import db
+    from models import User
+
+    with app.app_context():
+        admin = User(name=ADMIN["name"], email=ADMIN["email"], role="admin")
+        admin.set_password(ADMIN["password"])
+        db.session.add_all([
+            admin,
+            User(name="John Smith", email="john.smith@example.com", password_hash="x"),
+            User(name="Élodie Ångström", email="elodie@example.com", password_hash="x"),
+        ])
+        db.session.commit()
+    r = client.post("/api/admin/auth/login", json={"email": ADMIN["email"], "password": ADMIN["password"]})
+    return {"Authorization": f"Bearer {r.get_json()['access_token']}"}
+
+
+def names(client, headers, **params):
+    r = client.get("/api/admin/users", query_string=params, headers=headers)
+    assert r.status_code == 200, r.get_json()
+    return {u["name"] for u in r.get_json()["users"]}
+
+
+@pytest.mark.parametrize("query", ["Smith", "smi", "JOHN", "john sm", "sm jo"])
+def test_name_matches_any_word_prefix(client, headers, query):
+    assert names(client, headers, name=query) == {"John Smith"}
+
+
+def test_name_matches_non_ascii_case_insensitively(client, headers):
+    assert names(client, headers, name="élodie") == {"Élodie Ångström"}
+    assert names(client, headers, name="ÅNGSTR") == {"Élodie Ångström"}
+
+
+def test_name_search_follows_renames(app, client, headers):
+    from extensions import db
+    from models import User
+
+    with app.app_context():
+        user = User.query.filter_by(email="john.smith@example.com").first()
+        user.name = "John Smythe"
+        db.session.commit()
+    assert names(client, headers, name="smith") == set()
+    assert names(client, headers, name="smythe") == {"John Smythe"}
+
+
+@pytest.mark.parametrize("query", ["\U0010ffff", "a\U0010ffff\U0010ffff", "퟿", "---"])
+def test_edge_prefixes_do_not_fail(client, headers, query):
+    assert names(client, headers, name=query, email=query) == set()
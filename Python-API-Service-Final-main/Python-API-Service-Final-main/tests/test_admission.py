@@ -0,0 +1,63 @@
+"""Admission gates on a bare app with stand-in routes for the gated endpoints."""
+from flask import Flask, Response, jsonify
+
+import admission
+
+
+def make_app(groups, threads=8):
+    app = Flask(__name__)
+    app.config.update(
+        ADMISSION_ENABLED=True, ADMISSION_RETRY_AFTER=1, SERVE_THREADS=threads, ADMISSION_GROUPS=groups,
+    )
+    admission.init_app(app)
+
+    def stream():
+        return Response(iter(["data: x\n\n"]), mimetype="text/event-stream")
+
+    app.add_url_rule("/events", endpoint="front.order_events", view_func=stream)
+    app.add_url_rule("/products", endpoint="front.product_list", view_func=lambda: jsonify([]))
+    app.add_url_rule("/me", endpoint="front.me", view_func=lambda: jsonify({}))
+    app.add_url_rule("/health", endpoint="health", view_func=lambda: jsonify({"status": "ok"}))
+    return app
+
+
+def test_stream_holds_its_slot_until_closed():
+    app = make_app({"events": "2/0/0"})
+    client = app.test_client()
+    gate = app.extensions["admission"]["events"]
+
+    first, second = client.get("/events", buffered=False), client.get("/events", buffered=False)
+    assert (first.status_code, second.status_code) == (200, 200)
+    assert gate.active == 2  # the views have returned, but their bodies are still open
+
+    shed = client.get("/events")
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    assert client.get("/health").status_code == 200
+
+    first.close()
+    assert gate.active == 1
+    third = client.get("/events", buffered=False)
+    assert third.status_code == 200
+    second.close()
+    third.close()
+    assert gate.active == 0
+
+
+def test_groups_together_leave_a_thread_for_health():
+    # Each group fits in SERVE_THREADS - 1 on its own; together they would take every thread
+    app = make_app({"events": "2/0/0", "catalog": "2/0/0"}, threads=3)
+    client = app.test_client()
+
+    streams = [client.get("/events", buffered=False) for _ in range(2)]
+    assert [r.status_code for r in streams] == [200, 200]
+    assert app.extensions[admission.TOTAL_KEY].in_use == 2
+
+    assert client.get("/products").status_code == 503
+    assert client.get("/me").status_code == 503  # ungrouped routes count too
+    assert client.get("/health").status_code == 200
+
+    for r in streams:
+        r.close()
+    assert client.get("/products").status_code == 200
+    assert app.extensions[admission.TOTAL_KEY].in_use == 0
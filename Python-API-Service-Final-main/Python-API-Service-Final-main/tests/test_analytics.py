@@ -0,0 +1,72 @@
+"""Sales counters follow the paid/delivered definition that report_sale uses."""
+import pytest
+
+ADMIN = {"name": "Sales Admin", "email": "sales-admin@example.com", "password": "sales-admin-pw"}
+CUSTOMER = {"name": "Sales Customer", "email": "sales-customer@example.com", "password": "sales-pw"}
+PRODUCT_ID = 30
+
+
+@pytest.fixture(scope="module")
+def headers(app, client):
+    from extensions import db
+    from models import Product, User
+
+    with app.app_context():
+        for account, role in ((ADMIN, "admin"), (CUSTOMER, "customer")):
+            u = User(name=account["name"], email=account["email"], role=role)
+            u.set_password(account["password"])
+            db.session.add(u)
+        db.session.get(Product, PRODUCT_ID).stock = 100
+        db.session.commit()
+
+    out = {}
+    for role, account, url in (("admin", ADMIN, "/api/admin/auth/login"), ("customer", CUSTOMER, "/api/front/login")):
+        r = client.post(url, json={"email": account["email"], "password": account["password"]})
+        out[role] = {"Authorization": f"Bearer {r.get_json()['access_token']}"}
+    return out
+
+
+def counted_qty(app):
+    from extensions import db
+    from models import ProductSales
+
+    with app.app_context():
+        row = db.session.get(ProductSales, PRODUCT_ID)
+        return row.qty if row else 0
+
+
+def test_counters_follow_paid_and_delivered(app, client, headers):
+    start = counted_qty(app)
+    assert client.post("/api/front/add-to-cart", json={"product_id": PRODUCT_ID, "qty": 3},
+                       headers=headers["customer"]).status_code == 200
+    r = client.post("/api/front/checkout", headers=headers["customer"])
+    assert r.status_code == 200, r.get_json()
+    order_id = r.get_json()["order_id"]
+    assert counted_qty(app) == start  # pending: not a sale yet
+
+    def set_status(status):
+        r = client.patch(f"/api/admin/orders/{order_id}/status", json={"status": status}, headers=headers["admin"])
+        assert r.status_code == 200, r.get_json()
+        return counted_qty(app) - start
+
+    assert set_status("paid") == 3
+    assert set_status("shipped") == 0
+    assert set_status("delivered") == 3
+    assert set_status("cancelled") == 0
+
+
+def test_reconcile_uses_the_same_definition(app):
+    from analytics import reconcile
+    from extensions import db
+    from models import Order, OrderDetail
+    from sqlalchemy import func
+
+    with app.app_context():
+        reconcile()
+        expected = (
+            db.session.query(func.coalesce(func.sum(OrderDetail.qty), 0))
+            .join(Order, Order.id == OrderDetail.order_id)
+            .filter(OrderDetail.product_id == PRODUCT_ID, Order.status.in_(["paid", "delivered"]))
+            .scalar()
+        )
+    assert counted_qty(app) == expected
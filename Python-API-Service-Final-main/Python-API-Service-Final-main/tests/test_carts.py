@@ -0,0 +1,39 @@
+"""Background cart sweeper scheduling (the sweep itself is stubbed out)."""
+import time
+
+import pytest
+
+import carts
+
+
+@pytest.fixture
+def sweeps(app, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app, "instance_path", str(tmp_path))
+    monkeypatch.setitem(app.config, "CART_SWEEP_INTERVAL", 3600)
+    monkeypatch.setattr(carts, "sweep_expired_carts", lambda: calls.append(time.time()) or 0)
+    return calls
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_first_pass_runs_at_startup_in_one_worker(app, sweeps, tmp_path):
+    carts.start_background_sweeper(app)
+    carts.start_background_sweeper(app)  # a second worker: the lock is taken, so it only retries
+    assert wait_for(lambda: sweeps)
+    assert wait_for(lambda: carts.read_last_sweep(tmp_path / "cart-sweeper.last"))
+    time.sleep(0.2)
+    assert len(sweeps) == 1
+    assert carts.read_last_sweep(tmp_path / "cart-sweeper.last") == pytest.approx(sweeps[0], abs=1)
+
+
+def test_new_owner_waits_out_the_rest_of_the_interval(app, sweeps, tmp_path):
+    # The previous owner swept a minute ago, then was recycled
+    carts.write_last_sweep(tmp_path / "cart-sweeper.last", time.time() - 60)
+    carts.start_background_sweeper(app)
+    assert not wait_for(lambda: sweeps, timeout=0.3)
@@ -0,0 +1,39 @@
+"""Content coding follows the client's Accept-Encoding quality values."""
+import pytest
+from flask import Flask
+
+import compression
+
+BODY = "x" * 4096
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(COMPRESS_MIN_SIZE=1024, COMPRESS_LEVEL=6)
+    compression.init_app(app)
+    app.add_url_rule("/big", endpoint="big", view_func=lambda: BODY)
+    return app.test_client()
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip;q=0, br;q=0", None),
+    ("gzip, *;q=0", "gzip"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("gzip;q=0, *", "br"),
+    ("gzip, br", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_quality_values_are_honoured(client, accept, expected):
+    if expected == "br" and compression.brotli is None:
+        pytest.skip("brotli not installed")
+    r = client.get("/big", headers={"Accept-Encoding": accept})
+    assert r.headers.get("Content-Encoding") == expected
+    assert "Accept-Encoding" in r.headers["Vary"]
+
+
+def test_gzip_only_without_brotli(client, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert client.get("/big", headers={"Accept-Encoding": "br"}).headers.get("Content-Encoding") is None
+    assert client.get("/big", headers={"Accept-Encoding": "br, gzip;q=0.1"}).headers["Content-Encoding"] == "gzip"
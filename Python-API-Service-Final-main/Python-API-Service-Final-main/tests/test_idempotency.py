@@ -0,0 +1,74 @@
+"""Idempotency-Key on add-to-cart: replays, and attempts that die before storing a response."""
+import pytest
+
+import idempotency
+
+USER = {"name": "Idem User", "email": "idem-user@example.com", "password": "idem-pw"}
+
+
+@pytest.fixture(scope="module")
+def headers(app, client):
+    from extensions import db
+    from models import User
+
+    with app.app_context():
+        u = User(name=USER["name"], email=USER["email"], role="customer")
+        u.set_password(USER["password"])
+        db.session.add(u)
+        db.session.commit()
+    r = client.post("/api/front/login", json={"email": USER["email"], "password": USER["password"]})
+    return {"Authorization": f"Bearer {r.get_json()['access_token']}"}
+
+
+def cart_qty(app, headers, product_id):
+    from flask_jwt_extended import decode_token
+    from models import CartItem
+
+    with app.app_context():
+        user_id = int(decode_token(headers["Authorization"].split()[1])["sub"])
+        item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
+        return item.qty if item else 0
+
+
+def test_retry_replays_the_stored_response(app, client, headers):
+    h = {**headers, "Idempotency-Key": "idem-replay"}
+    first = client.post("/api/front/add-to-cart", json={"product_id": 20, "qty": 2}, headers=h)
+    again = client.post("/api/front/add-to-cart", json={"product_id": 20, "qty": 2}, headers=h)
+    assert first.status_code == again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.get_json() == first.get_json()
+    assert cart_qty(app, headers, 20) == 2
+
+    other = client.post("/api/front/add-to-cart", json={"product_id": 20, "qty": 5}, headers=h)
+    assert other.status_code == 422
+
+
+def test_attempt_that_dies_after_the_view_commits_leaves_nothing(app, client, headers, monkeypatch):
+    from models import IdempotencyKey
+
+    h = {**headers, "Idempotency-Key": "idem-crash"}
+
+    def die(*args, **kwargs):
+        raise SystemExit("worker killed")  # after the view committed, before the response is stored
+
+    with monkeypatch.context() as m:
+        m.setattr(idempotency, "make_response", die)
+        with pytest.raises(SystemExit):
+            client.post("/api/front/add-to-cart", json={"product_id": 21, "qty": 3}, headers=h)
+
+    assert cart_qty(app, headers, 21) == 0
+    with app.app_context():
+        assert IdempotencyKey.query.filter_by(key="idem-crash").first() is None
+
+    retry = client.post("/api/front/add-to-cart", json={"product_id": 21, "qty": 3}, headers=h)
+    assert retry.status_code == 200
+    assert cart_qty(app, headers, 21) == 3
+
+
+def test_expired_keys_are_pruned(app):
+    from models import IdempotencyKey
+
+    with app.app_context():
+        assert IdempotencyKey.query.filter(IdempotencyKey.expires_at < idempotency.utcnow()).count()
+        idempotency.prune_rows()
+        assert not IdempotencyKey.query.filter(IdempotencyKey.expires_at < idempotency.utcnow()).count()
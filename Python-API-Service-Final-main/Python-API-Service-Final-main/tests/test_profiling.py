@@ -0,0 +1,57 @@
+"""Profiling is switched on and off at runtime, for every worker, without a restart."""
+import pytest
+
+import profiling
+
+ADMIN = {"name": "Profile Admin", "email": "profile-admin@example.com", "password": "profile-pw"}
+
+
+@pytest.fixture(scope="module")
+def headers(app, client):
+    from extensions import db
+    from models import User
+
+    with app.app_context():
+        u = User(name=ADMIN["name"], email=ADMIN["email"], role="admin")
+        u.set_password(ADMIN["password"])
+        db.session.add(u)
+        db.session.commit()
+    r = client.post("/api/admin/auth/login", json={"email": ADMIN["email"], "password": ADMIN["password"]})
+    yield {"Authorization": f"Bearer {r.get_json()['access_token']}"}
+    client.put("/api/admin/profile/settings", json={"enabled": False, "sample_rate": 0.0},
+               headers={"Authorization": f"Bearer {r.get_json()['access_token']}"})
+
+
+def profiled_requests(client, headers, endpoint):
+    r = client.get("/api/admin/profile", headers=headers)
+    assert r.status_code == 200, r.get_json()
+    return r.get_json()["endpoints"].get(endpoint, {}).get("requests", 0)
+
+
+def test_enable_and_disable_at_runtime(app, client, headers):
+    assert client.delete("/api/admin/profile", headers=headers).status_code == 200
+    client.get("/health")
+    assert profiled_requests(client, headers, "health") == 0  # off by default
+
+    r = client.put("/api/admin/profile/settings", json={"enabled": True, "sample_rate": 1}, headers=headers)
+    assert r.status_code == 200, r.get_json()
+    client.get("/health")
+    assert profiled_requests(client, headers, "health") == 1
+
+    # Another worker picks the change up from the settings file
+    other = profiling.Settings(app.config["PROFILE_SETTINGS_FILE"], False, 0.0)
+    other.poll()
+    assert (other.enabled, other.rate) == (True, 1.0)
+
+    r = client.put("/api/admin/profile/settings", json={"enabled": False}, headers=headers)
+    assert r.get_json()["sample_rate"] == 1.0
+    client.get("/health")
+    assert profiled_requests(client, headers, "health") == 1
+    other.next_poll = 0.0
+    other.poll()
+    assert not other.enabled
+
+
+@pytest.mark.parametrize("body", [{"enabled": "yes"}, {"sample_rate": 2}, {"sample_rate": "nan"}, {"sample_rate": None}])
+def test_invalid_settings_are_rejected(client, headers, body):
+    assert client.put("/api/admin/profile/settings", json=body, headers=headers).status_code == 400
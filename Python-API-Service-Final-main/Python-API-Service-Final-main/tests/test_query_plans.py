@@ -0,0 +1,199 @@
+"""Every route's SQL must use an index.
+
+Each case calls a route through the test client, records the statements it sends
+to the database (before_cursor_execute) and runs EXPLAIN QUERY PLAN on them. A
+plan step that scans a table fails the case unless the table is listed in the
+case's allowed scans: endpoints that return a whole table, and unfiltered admin
+list pages (paged, with a capped count), scan by design.
+
+Cases are independent: rows a case needs (a cart line, a pending order, a fresh
+token for logout) are put in place by its entry in SETUP, so any subset selected
+with -k passes on its own.
+"""
+import pytest
+from sqlalchemy import event
+
+from conftest import SEED_ROWS
+
+ADMIN = {"name": "Plan Admin", "email": "plan-admin@example.com", "password": "admin-pw"}
+CUSTOMER = {"name": "Plan Customer", "email": "plan-customer@example.com", "password": "customer-pw"}
+
+# (case id, method, path, json body, caller, tables allowed to scan)
+# Paths are formatted with the ids from the `ids` fixture.
+ROUTES = [
+    ("front.category_list", "GET", "/api/front/category-list", None, None, {"category"}),
+    ("front.category_products", "GET", "/api/front/category-list/3", None, None, set()),
+    ("front.category_products filtered", "GET", "/api/front/category-list/3?min_price=10&in_stock=1&sort=price",
+     None, None, set()),
+    ("front.product_list", "GET", "/api/front/product-list", None, None, {"product"}),
+    ("front.register", "POST", "/api/front/register",
+     {"name": "New", "email": "new-user@example.com", "password": "pw"}, None, set()),
+    ("front.login", "POST", "/api/front/login",
+     {"email": CUSTOMER["email"], "password": CUSTOMER["password"]}, None, set()),
+    ("front.reset_password", "POST", "/api/front/reset-password",
+     {"email": "plan-reset@example.com", "new_password": "pw2"}, None, set()),
+    ("front.me", "GET", "/api/front/me", None, "customer", set()),
+    ("front.add_to_cart", "POST", "/api/front/add-to-cart", {"product_id": 7, "qty": 1}, "customer", set()),
+    ("front.delete_cart_item", "DELETE", "/api/front/cart/7", None, "customer", set()),
+    ("front.add_to_cart idempotent", "POST", "/api/front/add-to-cart", {"product_id": 8, "qty": 1},
+     "customer", set()),
+    ("front.checkout", "POST", "/api/front/checkout", None, "customer", set()),
+    ("front.tracking_order", "GET", "/api/front/tracking-order", None, "customer", set()),
+    ("admin.admin_login", "POST", "/api/admin/auth/login",
+     {"email": ADMIN["email"], "password": ADMIN["password"]}, None, set()),
+    ("admin.users_list", "GET", "/api/admin/users", None, "admin", {"user"}),
+    ("admin.users_list email", "GET", "/api/admin/users?email=user5", None, "admin", set()),
+    ("admin.users_list name", "GET", "/api/admin/users?name=user 5", None, "admin", set()),
+    ("admin.users_list role", "GET", "/api/admin/users?role=admin", None, "admin", set()),
+    ("admin.user_create", "POST", "/api/admin/users",
+     {"name": "Made", "email": "made@example.com", "password": "pw"}, "admin", set()),
+    ("admin.user_detail", "GET", "/api/admin/users/{spare_user}", None, "admin", set()),
+    ("admin.user_update", "PUT", "/api/admin/users/{spare_user}",
+     {"name": "Renamed", "email": "renamed@example.com"}, "admin", set()),
+    ("admin.user_delete", "DELETE", "/api/admin/users/{spare_user}", None, "admin", set()),
+    ("admin.category_create", "POST", "/api/admin/categories", {"name": "plan-category"}, "admin", set()),
+    ("admin.category_create bulk", "POST", "/api/admin/categories",
+     [{"name": "plan-bulk-1"}, {"name": "plan-bulk-2"}], "admin", set()),
+    ("admin.category_list_admin", "GET", "/api/admin/categories", None, "admin", {"category"}),
+    ("admin.category_update", "PUT", "/api/admin/categories/3", {"name": "renamed-category"}, "admin", set()),
+    ("admin.category_delete", "DELETE", "/api/admin/categories/{empty_category}", None, "admin", set()),
+    ("admin.product_list_admin", "GET", "/api/admin/products", None, "admin", {"product"}),
+    ("admin.product_create", "POST", "/api/admin/products",
+     {"category_id": 3, "name": "plan-product", "price": 5}, "admin", set()),
+    ("admin.product_create bulk", "POST", "/api/admin/products",
+     [{"category_id": 3, "name": "plan-bulk", "price": 5}, {"category_id": 4, "name": "plan-bulk", "price": 6}],
+     "admin", set()),
+    ("admin.product_update", "PUT", "/api/admin/products/7", {"price": 9.5, "category_id": 4}, "admin", set()),
+    ("admin.product_delete", "DELETE", "/api/admin/products/{spare_product}", None, "admin", set()),
+    ("admin.orders_list", "GET", "/api/admin/orders", None, "admin", {"order"}),
+    ("admin.orders_export status", "GET", "/api/admin/orders/export?status=cancelled", None, "admin", set()),
+    ("admin.orders_export dates", "GET", "/api/admin/orders/export?from=2025-01-02&to=2025-01-02", None, "admin",
+     set()),
+    ("admin.order_details", "GET", "/api/admin/orders/11", None, "admin", set()),
+    ("admin.order_update_status", "PATCH", "/api/admin/orders/11/status", {"status": "paid"}, "admin", set()),
+    ("admin.report_sale", "GET", "/api/admin/report/sale", None, "admin", set()),
+    ("admin.report_top_products", "GET", "/api/admin/report/top-products", None, "admin", set()),
+    ("admin.report_category_revenue", "GET", "/api/admin/report/category-revenue", None, "admin",
+     {"category", "product", "product_sales"}),
+    ("front.logout", "POST", "/api/front/logout", None, "fresh customer", set()),
+    ("admin.admin_logout", "POST", "/api/admin/auth/logout", None, "fresh admin", set()),
+]
+
+
+def cart_line(product_id):
+    """SETUP entry: the customer has product_id in the cart and it is in stock."""
+    def setup(ids):
+        from extensions import db
+        from models import CartItem, Product
+
+        db.session.get(Product, product_id).stock = 50
+        if not CartItem.query.filter_by(user_id=ids["customer"], product_id=product_id).first():
+            db.session.add(CartItem(user_id=ids["customer"], product_id=product_id, qty=1))
+    return setup
+
+
+def pending_order(order_id):
+    def setup(ids):
+        from extensions import db
+        from models import Order
+
+        db.session.get(Order, order_id).status = "pending"
+    return setup
+
+
+# case id -> callable(ids) run in an app context (and committed) before the request
+SETUP = {
+    "front.delete_cart_item": cart_line(7),
+    "front.checkout": cart_line(8),
+    "admin.order_update_status": pending_order(11),
+}
+
+
+@pytest.fixture(scope="module")
+def ids(app):
+    from extensions import db
+    from models import User, Category, Product
+
+    with app.app_context():
+        admin = User(name=ADMIN["name"], email=ADMIN["email"], role="admin")
+        admin.set_password(ADMIN["password"])
+        customer = User(name=CUSTOMER["name"], email=CUSTOMER["email"], role="customer")
+        customer.set_password(CUSTOMER["password"])
+        spare_user = User(name="Spare", email="spare@example.com", password_hash="x")
+        reset_user = User(name="Reset", email="plan-reset@example.com", password_hash="x")
+        empty_category = Category(name="plan-empty")
+        spare_product = Product(category_id=3, name="plan-spare", price=1.0, stock=1)
+        db.session.add_all([admin, customer, spare_user, reset_user, empty_category, spare_product])
+        db.session.commit()
+        return {
+            "customer": customer.id,
+            "spare_user": spare_user.id,
+            "empty_category": empty_category.id,
+            "spare_product": spare_product.id,
+        }
+
+
+def login(client, role):
+    account, url = {"admin": (ADMIN, "/api/admin/auth/login"), "customer": (CUSTOMER, "/api/front/login")}[role]
+    r = client.post(url, json={"email": account["email"], "password": account["password"]})
+    assert r.status_code == 200, r.get_json()
+    return r.get_json()["access_token"]
+
+
+@pytest.fixture(scope="module")
+def tokens(client, ids):
+    return {role: login(client, role) for role in ("admin", "customer")}
+
+
+def plan_scans(conn, statement, params):
+    """Tables that a statement's plan reads in full (subquery/CTE result scans don't count)."""
+    steps = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params)]
+    tables = set()
+    for step in steps:
+        words = step.split()
+        if words[0] == "SCAN" and words[1] != "CONSTANT" and not words[1].startswith("anon_"):
+            tables.add(words[1])
+    return tables, steps
+
+
+@pytest.mark.parametrize("case", ROUTES, ids=[r[0] for r in ROUTES])
+def test_route_queries_use_indexes(app, client, ids, tokens, case):
+    from extensions import db
+
+    name, method, path, body, caller, allowed = case
+    statements = []
+
+    def record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+            if executemany and params and isinstance(params[0], (list, tuple, dict)):
+                params = params[0]  # one parameter set is enough for the plan
+            statements.append((statement, params))
+
+    headers = {"Idempotency-Key": f"plan-{name}"}
+    if caller:
+        # Logout cases revoke their token, so they get one of their own
+        token = login(client, caller.split()[1]) if caller.startswith("fresh ") else tokens[caller]
+        headers["Authorization"] = f"Bearer {token}"
+
+    with app.app_context():
+        if name in SETUP:
+            SETUP[name](ids)
+            db.session.commit()
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        resp = client.open(path.format(**ids), method=method, json=body, headers=headers)
+        resp.get_data()  # drain streamed responses so their queries run
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert resp.status_code < 400, (resp.status_code, resp.get_data(as_text=True))
+    assert statements, f"{name} issued no SQL"
+
+    failures = []
+    with engine.connect() as conn:
+        for statement, params in statements:
+            tables, steps = plan_scans(conn, statement, params)
+            if tables - allowed:
+                failures.append(f"{statement}\n    " + "\n    ".join(steps))
+    assert not failures, f"{name} scans with {SEED_ROWS} seeded rows:\n" + "\n".join(failures)
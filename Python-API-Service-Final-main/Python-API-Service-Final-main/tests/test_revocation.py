@@ -0,0 +1,108 @@
+"""Logout revocation: the blocklist check, cross-worker sync and pruning."""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+USER = {"name": "Revoke User", "email": "revoke-user@example.com", "password": "revoke-pw"}
+
+
+@pytest.fixture(scope="module")
+def user(app):
+    from extensions import db
+    from models import User
+
+    with app.app_context():
+        u = User(name=USER["name"], email=USER["email"], role="customer")
+        u.set_password(USER["password"])
+        db.session.add(u)
+        db.session.commit()
+        return u.id
+
+
+def login(client):
+    r = client.post("/api/front/login", json={"email": USER["email"], "password": USER["password"]})
+    assert r.status_code == 200, r.get_json()
+    return {"Authorization": f"Bearer {r.get_json()['access_token']}"}
+
+
+def test_logged_out_token_is_rejected(client, user):
+    headers = login(client)
+    assert client.get("/api/front/me", headers=headers).status_code == 200
+    assert client.post("/api/front/logout", headers=headers).status_code == 200
+    assert client.get("/api/front/me", headers=headers).status_code == 401
+
+    # A fresh login still works
+    assert client.get("/api/front/me", headers=login(client)).status_code == 200
+
+
+def test_revocation_reaches_other_workers_on_sync(app):
+    from revocation import RevocationStore
+
+    exp = (datetime.now() + timedelta(hours=1)).timestamp()
+    with app.app_context():
+        writer, reader = RevocationStore(), RevocationStore()
+        reader.sync(force=True)
+        assert not reader.is_revoked("sync-jti")
+
+        writer.revoke("sync-jti", exp)
+        assert writer.is_revoked("sync-jti")
+        reader.sync(force=True)
+        assert reader.is_revoked("sync-jti")
+
+
+def test_sync_queries_once_per_interval(app):
+    from extensions import db
+    from revocation import RevocationStore
+    from sqlalchemy import event
+
+    with app.app_context():
+        store = RevocationStore()
+        store.sync(force=True)
+        store.next_sync = 0.0  # due: every waiting thread sees an expired interval
+
+        queries = []
+
+        def record(conn, cursor, statement, params, context, executemany):
+            if "revoked_token" in statement:
+                queries.append(statement)
+
+        def check():
+            with app.app_context():
+                store.is_revoked("nobody")
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            with store.lock:  # queue every thread on the lock before any of them syncs
+                threads = [threading.Thread(target=check) for _ in range(8)]
+                for t in threads:
+                    t.start()
+            for t in threads:
+                t.join()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        assert len(queries) == 1
+
+
+def test_prune_drops_expired_entries_and_rows(app):
+    from models import RevokedToken
+    from revocation import RevocationStore, prune_rows
+
+    past = (datetime.now() - timedelta(hours=1)).timestamp()
+    future = (datetime.now() + timedelta(hours=1)).timestamp()
+    with app.app_context():
+        store = RevocationStore()
+        store.revoke("expired-jti", past)
+        store.revoke("live-jti", future)
+        # Loaded by a sync before it expired
+        store._add("expired-jti", datetime.utcnow() - timedelta(hours=1))
+        assert store.is_revoked("expired-jti")
+
+        with store.lock:
+            store.prune()
+        assert not store.is_revoked("expired-jti")
+        assert store.is_revoked("live-jti")
+
+        assert prune_rows() >= 1
+        remaining = {t.jti for t in RevokedToken.query.filter(RevokedToken.jti.in_(["expired-jti", "live-jti"]))}
+        assert remaining == {"live-jti"}
@@ -0,0 +1,91 @@
+"""Catalog snapshot: answers match the database path, and checkout only ever patches."""
+import json
+
+import pytest
+
+import snapshot
+
+FILTERS = [
+    "",
+    "?sort=price",
+    "?sort=-price",
+    "?min_price=20&max_price=40",
+    "?in_stock=1&sort=price",
+    "?min_price=95&in_stock=true&sort=-price",
+]
+
+
+@pytest.fixture
+def snap_app(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "CATALOG_SNAPSHOT_FILE", str(tmp_path / "catalog.snapshot"))
+    monkeypatch.setitem(app.config, "CATALOG_SNAPSHOT_ENABLED", True)
+    with app.app_context():
+        snapshot.build_snapshot()
+    return app
+
+
+def get_json(client, app, path, enabled):
+    app.config["CATALOG_SNAPSHOT_ENABLED"] = enabled
+    r = client.get(path)
+    assert r.status_code == 200, r.get_data(as_text=True)
+    return json.loads(r.get_data())
+
+
+@pytest.mark.parametrize("query", FILTERS)
+@pytest.mark.parametrize("path", ["/api/front/product-list", "/api/front/category-list/3"])
+def test_snapshot_matches_database(snap_app, client, path, query):
+    with snap_app.app_context():
+        assert snapshot.get_snapshot() is not None
+    from_snapshot = get_json(client, snap_app, path + query, True)
+    from_db = get_json(client, snap_app, path + query, False)
+    assert from_snapshot == from_db
+
+
+def test_invalid_filters_are_rejected(client):
+    assert client.get("/api/front/product-list?sort=name").status_code == 400
+    assert client.get("/api/front/product-list?min_price=nan").status_code == 400
+
+
+def test_checkout_never_rebuilds(snap_app, monkeypatch):
+    from catalog import bump_catalog_version
+
+    with snap_app.app_context():
+        bump_catalog_version()  # admin change: rebuilt
+        snap = snapshot.get_snapshot()
+        assert snap is not None
+
+        monkeypatch.setattr(snapshot, "build_snapshot", lambda: pytest.fail("checkout rebuilt the snapshot"))
+        version = bump_catalog_version(stock_changed=[7])  # directly on top: patched in place
+        assert snapshot.load_snapshot().version == version
+
+        # Two bumps race and the later one refreshes first: skipped, readers fall back
+        from catalog import version_path
+        with open(version_path(), "r+") as f:
+            current, last_modified = f.read().split()
+            f.seek(0)
+            f.write(f"{int(current) + 1} {last_modified}")
+        snapshot.refresh_snapshot(int(current) + 2, stock_changed=[7])
+        assert snapshot.load_snapshot().version == version
+
+
+def test_patch_updates_stock_and_invalidates_overlapping_reads(snap_app):
+    from extensions import db
+    from models import Product
+
+    with snap_app.app_context():
+        snap = snapshot.load_snapshot()
+        version = snap.version
+        db.session.get(Product, 7).stock = 12345
+        db.session.commit()
+
+        def read_during_patch():
+            body = snap.products_json()
+            snapshot.patch_stock(snap, version + 1, [7])
+            return body
+
+        assert snap.consistent(read_during_patch) == (False, None)
+        assert snap.version == version + 1
+        r = snap.record_number(7)
+        assert snap.stocks[r] == 12345
+        assert json.loads(bytes(snap.record(r)))["stock"] == 12345
+        assert snap.consistent(snap.products_json)[0]